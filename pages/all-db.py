@@ -4,6 +4,8 @@ import sqlite3
 conn = sqlite3.connect('users.db')
 c = conn.cursor()
 
+# The schema and its indexes are created by pages/migrations.py; the DDL below is kept for reference
+
 # # Create a table to store user information
 # c.execute('''
 #     CREATE TABLE IF NOT EXISTS users (
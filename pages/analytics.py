@@ -0,0 +1,542 @@
+import os
+import sys
+import time
+import threading
+import numpy as np
+import pandas as pd
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Columnar cache for the analytics CSVs in Data/New.
+#
+# Each CSV is converted once into a compressed Parquet file next to it, with the date columns
+# already parsed and the low-cardinality text columns stored as categoricals. The Parquet file
+# is rebuilt automatically whenever the CSV is newer, and pages read only the columns they use.
+#
+# Pages get their frames from shared_table(), which keeps one copy of each table per process
+# (shared by every session) and hands out shallow copies, so a rerun never copies the data. The
+# arrays underneath are shared: a page that changes values works on its own .copy() of the
+# columns it changes.
+#
+# Next to each frame sits a SalesCube, pre-aggregated once per load, which answers the report
+# pages' totals and charts from a few thousand cells instead of filtering every row.
+#
+# Tables with an order_purchase_timestamp are kept sorted by it, so a date range is a pair of
+# binary searches (DateIndex) and the matching rows are a zero-copy slice of the shared frame.
+
+DATA_DIR = os.path.join('Data', 'New')
+
+TABLES = ['all_details', 'orders_all', 'weekly_sales_predicted']
+
+DATE_COLUMNS = [
+    'order_purchase_timestamp', 'order_delivered_carrier_date',
+    'order_delivered_customer_date', 'order_estimated_delivery_date',
+    'shipping_limit_date', 'review_answer_timestamp'
+]
+
+CATEGORY_COLUMNS = ['product_category', 'order_status', 'payment_type', 'customer_state', 'seller_state']
+
+
+def csv_path(name):
+    return os.path.join(DATA_DIR, f'{name}.csv')
+
+def parquet_path(name):
+    return os.path.join(DATA_DIR, f'{name}.parquet')
+
+# Function to check whether the Parquet copy is missing or older than its CSV
+def is_stale(name):
+    if not os.path.exists(parquet_path(name)):
+        return True
+    return os.path.getmtime(parquet_path(name)) < os.path.getmtime(csv_path(name))
+
+# Function to convert one CSV into its typed Parquet copy
+def build_table(name):
+    df = pd.read_csv(csv_path(name), low_memory=False)
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    df = _sort_by_time(df)
+
+    # Write to a temporary file first so a concurrent reader never sees a half-written file
+    tmp_path = f'{parquet_path(name)}.{os.getpid()}.tmp'
+    df.to_parquet(tmp_path, compression='zstd', index=False)
+    os.replace(tmp_path, parquet_path(name))
+    return df
+
+# Function to order rows by purchase time (missing timestamps last), as DateIndex expects
+def _sort_by_time(df):
+    if 'order_purchase_timestamp' not in df.columns:
+        return df
+    return df.sort_values('order_purchase_timestamp', kind='stable', na_position='last', ignore_index=True)
+
+# Function to load a table (optionally only some columns), rebuilding the cache if needed
+def load_table(name, columns=None):
+    if is_stale(name):
+        build_table(name)
+    return pd.read_parquet(parquet_path(name), columns=columns)
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Process-wide frames shared by every session
+
+_frames = {}  # name -> (parquet mtime, DataFrame, {derived structure name: object})
+_frames_lock = threading.Lock()
+
+def _shared_entry(name):
+    with _frames_lock:
+        if is_stale(name):
+            build_table(name)
+        mtime = os.path.getmtime(parquet_path(name))
+        entry = _frames.get(name)
+        if entry is None or entry[0] != mtime:
+            # Parquet files written before rows were kept in time order are sorted on load
+            entry = (mtime, _sort_by_time(pd.read_parquet(parquet_path(name))), {})
+            _frames[name] = entry
+        return entry
+
+# Function to build something derived from a shared table once per load of that table
+def _shared_derived(name, key, build):
+    _, df, derived = _shared_entry(name)
+    if key not in derived:
+        # Built outside the lock; a reload replaces the whole entry, so a stale result is never reused
+        derived[key] = build(df)
+    return derived[key]
+
+# Function to get a shallow copy of a table (optionally only some columns), loading it once per
+# process; its arrays are shared by every session, so never write into them
+def shared_table(name, columns=None):
+    df = _shared_entry(name)[1]
+    return df[columns] if columns is not None else df.copy(deep=False)
+
+# Function to get the pre-aggregated cube of a table, built the first time it is asked for
+def shared_cube(name):
+    return _shared_derived(name, 'cube', SalesCube.from_frame)
+
+# Function to get the purchase-time index of a table, built the first time it is asked for
+def shared_date_index(name):
+    return _shared_derived(name, 'date_index', DateIndex)
+
+# Function to get the weekly/monthly/yearly sales totals of a table, computed once per load
+def shared_sales_rollups(name):
+    return _shared_derived(name, 'sales_rollups', sales_rollups)
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Date-range lookups over a table sorted by order_purchase_timestamp
+
+
+class DateIndex:
+    # Row positions come from np.searchsorted on the sorted timestamps and price totals from a
+    # prefix-sum array, so counting or summing any date range costs two binary searches.
+
+    def __init__(self, df):
+        # Nanoseconds throughout, so lookups never make NumPy convert the whole array to a common unit
+        self.timestamps = df['order_purchase_timestamp'].to_numpy().astype('datetime64[ns]')
+        # Missing timestamps are sorted last; keep them out of every range
+        self.size = int(np.count_nonzero(~np.isnat(self.timestamps)))
+        self.timestamps = self.timestamps[:self.size]
+        self.price_prefix = np.concatenate(([0.0], np.cumsum(df['price'].fillna(0).to_numpy(dtype=np.float64)[:self.size])))
+
+    def _position(self, when):
+        key = np.datetime64(pd.Timestamp(when).as_unit('ns'))
+        return int(np.searchsorted(self.timestamps, key, side='left'))
+
+    # Function to get the row positions [lo, hi) with start <= order_purchase_timestamp < end
+    def bounds(self, start=None, end=None):
+        lo = 0 if start is None else self._position(start)
+        hi = self.size if end is None else self._position(end)
+        return lo, max(lo, hi)
+
+    def count(self, start=None, end=None):
+        lo, hi = self.bounds(start, end)
+        return hi - lo
+
+    def total_price(self, start=None, end=None):
+        lo, hi = self.bounds(start, end)
+        return self.price_prefix[hi] - self.price_prefix[lo]
+
+    # Function to get the rows of df (the frame the index was built from) inside the range, without copying
+    def slice(self, df, start=None, end=None):
+        lo, hi = self.bounds(start, end)
+        return df.iloc[lo:hi]
+
+# Function to time date-range count/sum/rows through DateIndex and through a boolean mask, on
+# synthetic orders sorted by purchase time
+def benchmark_date_index(rows=10_000_000, lookups=100):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'order_purchase_timestamp': np.datetime64('2016-01-01') + np.sort(rng.integers(0, 3 * 365 * 86400, rows)).astype('timedelta64[s]'),
+        'price': rng.gamma(2, 60, rows),
+    })
+    start = time.perf_counter()
+    index = DateIndex(df)
+    build_time = time.perf_counter() - start
+    ts = df['order_purchase_timestamp']
+    days = rng.integers(0, 3 * 365, (lookups, 2))
+    ranges = [(pd.Timestamp('2016-01-01') + pd.Timedelta(days=int(a)), pd.Timestamp('2016-01-01') + pd.Timedelta(days=int(b)))
+              for a, b in np.sort(days, axis=1)]
+
+    times = {'date index': [], 'boolean mask': []}
+    for range_start, range_end in ranges:
+        start = time.perf_counter()
+        indexed = index.count(range_start, range_end), index.total_price(range_start, range_end), index.slice(df, range_start, range_end)
+        times['date index'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        masked = df[(ts >= range_start) & (ts < range_end)]
+        masked = len(masked), masked['price'].sum(), masked
+        times['boolean mask'].append(time.perf_counter() - start)
+        if indexed[0] != masked[0] or not np.isclose(indexed[1], masked[1]):
+            raise AssertionError(f'{range_start}..{range_end}: index {indexed[:2]} != mask {masked[:2]}')
+    print(f'{rows:,} rows, index built in {build_time:.2f}s; count + sum + rows per range over {lookups} ranges:')
+    for label, samples in times.items():
+        print(f'  {label}: p50 {np.percentile(samples, 50) * 1000:.3f} ms, p99 {np.percentile(samples, 99) * 1000:.3f} ms')
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# OLAP cube for the z_* report pages
+
+CUBE_DIMENSIONS = ['product_category', 'customer_state', 'payment_type', 'order_status']
+REVIEW_SCORES = [1, 2, 3, 4, 5]
+PRICE_BINS = 20
+
+
+class SalesCube:
+    # One cell per (product_category, customer_state, payment_type, order_status, day) that has
+    # orders, holding the price sum, the row count, a review_score histogram and a histogram of
+    # price over PRICE_BINS equal-width bins spanning the whole table. Cells are sorted by day so
+    # date ranges are a binary search.
+
+    def __init__(self, cells, price_edges):
+        self.cells = cells
+        self.price_edges = price_edges
+
+    @classmethod
+    def from_frame(cls, df):
+        dimensions = [col for col in CUBE_DIMENSIONS if col in df.columns]
+        price = df['price']
+        price_edges = np.linspace(price.min(), price.max(), PRICE_BINS + 1)
+        # Rightmost edge is inclusive, like np.histogram; missing prices fall in no bin
+        price_bin = np.clip(np.searchsorted(price_edges, price.to_numpy(), side='right') - 1, 0, PRICE_BINS - 1)
+        price_bin[price.isna().to_numpy()] = -1
+
+        measures = {'price': price, 'count': np.ones(len(df), dtype=np.int64)}
+        for score in REVIEW_SCORES:
+            measures[f'review_{score}'] = (df['review_score'] == score).to_numpy(dtype=np.int64)
+        for b in range(PRICE_BINS):
+            measures[f'price_bin_{b}'] = (price_bin == b).astype(np.int64)
+        measures = pd.DataFrame(measures, index=df.index)
+
+        keys = [df[col] for col in dimensions] + [df['order_purchase_timestamp'].dt.floor('D').rename('day')]
+        cells = measures.groupby(keys, observed=True, dropna=False, sort=False).sum().reset_index()
+        cells = cells.sort_values('day', kind='stable', ignore_index=True)
+        return cls(cells, price_edges)
+
+    # Function to narrow the cube to whole days between start and end (inclusive) and/or to
+    # given dimension values, e.g. cube.select(product_category='toys')
+    def select(self, start=None, end=None, **values):
+        cells = self.cells
+        if start is not None or end is not None:
+            days = cells['day'].to_numpy()
+            lo = 0 if start is None else np.searchsorted(days, np.datetime64(pd.Timestamp(start).floor('D')), side='left')
+            hi = len(days) if end is None else np.searchsorted(days, np.datetime64(pd.Timestamp(end).floor('D')), side='right')
+            cells = cells.iloc[lo:hi]
+        for col, value in values.items():
+            cells = cells[cells[col] == value]
+        return SalesCube(cells, self.price_edges)
+
+    def count(self):
+        return int(self.cells['count'].sum())
+
+    def total_price(self):
+        return self.cells['price'].sum()
+
+    # Function to get the order count per value of a dimension, like df[column].value_counts()
+    def value_counts(self, column):
+        counts = self.cells.groupby(column, observed=True)['count'].sum()
+        counts = counts[counts > 0].sort_values(ascending=False, kind='stable')
+        return counts.rename_axis(column).reset_index(name='count')
+
+    def review_histogram(self):
+        counts = [int(self.cells[f'review_{score}'].sum()) for score in REVIEW_SCORES]
+        return pd.DataFrame({'review_score': REVIEW_SCORES, 'count': counts})
+
+    def price_histogram(self):
+        counts = [int(self.cells[f'price_bin_{b}'].sum()) for b in range(PRICE_BINS)]
+        midpoints = (self.price_edges[:-1] + self.price_edges[1:]) / 2
+        return pd.DataFrame({'price': midpoints, 'count': counts})
+
+
+# Function to compare every cube answer with the equivalent pandas filtering of the rows
+def check_cube(df, cube):
+    problems = []
+
+    def compare(label, rows, sub):
+        if len(rows) != sub.count():
+            problems.append(f'{label}: count {sub.count()} != {len(rows)}')
+        if not np.isclose(rows['price'].sum(), sub.total_price()):
+            problems.append(f'{label}: price {sub.total_price()} != {rows["price"].sum()}')
+        reviews = rows['review_score'].value_counts()
+        if [int(reviews.get(score, 0)) for score in REVIEW_SCORES] != sub.review_histogram()['count'].tolist():
+            problems.append(f'{label}: review histogram differs')
+        expected, _ = np.histogram(rows['price'].dropna(), bins=cube.price_edges)
+        if expected.tolist() != sub.price_histogram()['count'].tolist():
+            problems.append(f'{label}: price histogram differs')
+        for col in CUBE_DIMENSIONS:
+            if col in rows.columns:
+                expected = rows[col].value_counts()
+                got = sub.value_counts(col).set_index(col)['count']
+                if expected[expected > 0].sort_index().to_dict() != got.sort_index().to_dict():
+                    problems.append(f'{label}: {col} counts differ')
+
+    compare('all rows', df, cube)
+    for col in CUBE_DIMENSIONS:
+        if col in df.columns:
+            for value in df[col].dropna().unique():
+                compare(f'{col}={value}', df[df[col] == value], cube.select(**{col: value}))
+
+    ts = df['order_purchase_timestamp']
+    for start, end in [(ts.min(), ts.max()), (ts.quantile(0.25), ts.quantile(0.5))]:
+        start, end = start.floor('D'), end.floor('D')
+        rows = df[(ts >= start) & (ts < end + pd.Timedelta(days=1))]
+        compare(f'{start.date()}..{end.date()}', rows, cube.select(start=start, end=end))
+    return problems
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Sales totals per week, month and year
+
+
+# Function to sum price per period with vectorized date arithmetic (no per-row Python calls)
+def sales_rollups(df):
+    ts = df['order_purchase_timestamp']
+    day = ts.dt.normalize()
+    periods = {
+        # Monday of the week, the same as .dt.to_period('W').start_time
+        'Weekly': ('Weekly Date', day - pd.to_timedelta(ts.dt.dayofweek, unit='D')),
+        'Monthly': ('Month', day - pd.to_timedelta(ts.dt.day - 1, unit='D')),
+        'Yearly': ('Year', ts.dt.year),
+    }
+    rollups = {}
+    for interval, (column, key) in periods.items():
+        rollups[interval] = df['price'].groupby(key.rename(column)).sum().reset_index()
+    return rollups
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Chart data kept to a fixed size
+#
+# Histograms reach the figures as bin edges and counts (see SalesCube) and long line series are
+# thinned with Largest-Triangle-Three-Buckets, so the figure JSON does not grow with the data.
+
+MAX_CHART_POINTS = 500
+# Serialized figure size the bounded charts must stay under, whatever the row count
+MAX_FIGURE_BYTES = 100_000
+
+
+# Function to pick at most threshold indices of (x, y) that keep the visual shape of the line
+def lttb(x, y, threshold=MAX_CHART_POINTS):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # First and last points are always kept; the rest are split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third corner of the triangle
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        areas = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+# Function to thin a frame sorted by x_column down to at most threshold rows for a line chart
+def downsample(df, x_column, y_column, threshold=MAX_CHART_POINTS):
+    x = df[x_column]
+    if pd.api.types.is_datetime64_any_dtype(x):
+        x = x.astype('int64')
+    return df.iloc[lttb(x.to_numpy(), df[y_column].fillna(0).to_numpy(), threshold)]
+
+# Function to build an orders frame shaped like the analytics tables (sorted by purchase time,
+# categorical dimensions, some missing prices and review scores) from random data
+def synthetic_orders(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    price = rng.gamma(2, 60, rows)
+    price[rng.random(rows) < 0.01] = np.nan
+    review_score = rng.integers(1, 6, rows).astype(np.float64)
+    review_score[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        'order_purchase_timestamp': np.datetime64('2017-01-01') + np.sort(rng.integers(0, 700 * 86400, rows)).astype('timedelta64[s]'),
+        'price': price,
+        'review_score': review_score,
+        'product_category': pd.Categorical(rng.choice(['toys', 'books', 'garden', 'health'], rows)),
+        'customer_state': pd.Categorical(rng.choice(['SP', 'RJ', 'MG', 'RS', 'BA'], rows)),
+        'payment_type': pd.Categorical(rng.choice(['credit_card', 'boleto', 'debit_card', 'voucher'], rows)),
+        'order_status': pd.Categorical(rng.choice(['delivered', 'shipped', 'canceled'], rows)),
+    })
+
+# Function to confirm chart data stays bounded however many rows go in
+def check_chart_sizes(rows=1_000_000):
+    problems = []
+    df = synthetic_orders(rows)
+    cube = SalesCube.from_frame(df)
+    if len(cube.price_histogram()) != PRICE_BINS or len(cube.review_histogram()) != len(REVIEW_SCORES):
+        problems.append('histogram size depends on the data')
+    thinned = downsample(df, 'order_purchase_timestamp', 'price')
+    if len(thinned) > MAX_CHART_POINTS:
+        problems.append(f'downsample kept {len(thinned)} of {rows} points')
+    if thinned.index[0] != df.index[0] or thinned.index[-1] != df.index[-1]:
+        problems.append('downsample dropped an end point')
+    if not thinned['order_purchase_timestamp'].is_monotonic_increasing:
+        problems.append('downsample reordered the points')
+    return problems + check_figure_sizes(df, cube, thinned)
+
+# Function to compare the serialized size of each figure built from every row with the one built
+# from the cube histogram or the downsampled line, as the pages draw them
+def check_figure_sizes(df, cube, thinned):
+    try:
+        import plotly.express as px
+    except ImportError:
+        print('charts: plotly is not installed, figure payload sizes not checked')
+        return []
+    problems = []
+    figures = {
+        'price histogram': (px.histogram(df, x='price', nbins=PRICE_BINS),
+                            px.bar(cube.price_histogram(), x='price', y='count')),
+        'sales line': (px.line(df, x='order_purchase_timestamp', y='price'),
+                       px.line(thinned, x='order_purchase_timestamp', y='price')),
+    }
+    for label, (raw, bounded) in figures.items():
+        before, after = len(raw.to_json()), len(bounded.to_json())
+        print(f'charts: {label} figure {before / 1024:,.0f} KB from {len(df):,} rows, {after / 1024:,.1f} KB bounded')
+        if after > MAX_FIGURE_BYTES:
+            problems.append(f'{label} figure is {after:,} bytes, over {MAX_FIGURE_BYTES:,}')
+        if after * 10 > before:
+            problems.append(f'{label} figure only shrank from {before:,} to {after:,} bytes')
+    return problems
+
+
+# Function to time z_category-style reruns from concurrent sessions, first on the shared frame and
+# then the way the pages used to work (a deep copy from @st.cache_data plus date parsing per rerun)
+def benchmark_sessions(name, sessions=5, reruns=20):
+    import resource
+    import warnings
+    # Rows whose dates do not parse are expected; the old pages warned about them on every rerun too
+    warnings.filterwarnings('ignore', 'Could not infer format')
+    categories = shared_table(name, ['product_category'])['product_category'].dropna().unique().tolist()
+    cached_csv = pd.read_csv(csv_path(name), low_memory=False)
+
+    def rerun_shared(category):
+        df = shared_table(name)
+        cube = shared_cube(name)
+        filtered = df[df['product_category'] == category]
+        selection = cube.select(product_category=category)
+        selection.count(), selection.total_price()
+        selection.price_histogram(), selection.review_histogram(), selection.value_counts('order_status')
+        return filtered.iloc[:50]
+
+    def rerun_copied(category):
+        df = cached_csv.copy()
+        for col in DATE_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], errors='coerce')
+        filtered = df[df['product_category'] == category]
+        filtered['price'].sum(), filtered['review_score'].value_counts(), filtered['order_status'].value_counts()
+        return filtered.drop(columns=['product_category'])
+
+    # Peak RSS only grows, so the cheaper mode runs first
+    for label, rerun in [('shared frame', rerun_shared), ('per-session copy', rerun_copied)]:
+        # The first rerun loads the Parquet file and builds the cube; time steady-state reruns
+        rerun(categories[0])
+        times, lock = [], threading.Lock()
+        barrier = threading.Barrier(sessions)
+
+        def session(i):
+            barrier.wait()
+            for j in range(reruns):
+                start = time.perf_counter()
+                rerun(categories[(i + j) % len(categories)])
+                with lock:
+                    times.append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f'{name}, {label}: {sessions} sessions x {reruns} reruns, p50 {np.percentile(times, 50) * 1000:.1f} ms, '
+              f'p99 {np.percentile(times, 99) * 1000:.1f} ms per rerun, peak RSS {peak_mb:,.0f} MB')
+
+if __name__ == '__main__':
+    # python -m pages.analytics          rebuild every table
+    # python -m pages.analytics --bench [--rows N]
+    #                                    date-range lookups on N (default 10M) synthetic rows with
+    #                                    DateIndex and with a boolean mask, then compare the CSV
+    #                                    path with the Parquet cache
+    # python -m pages.analytics --sessions [N]
+    #                                    per-rerun latency and peak RSS with N (default 5) concurrent sessions
+    # python -m pages.analytics --check  verify the cubes (of synthetic orders, and of the Data/New
+    #                                    tables if present) against plain pandas filtering and
+    #                                    that chart data stays bounded
+    if '--check' in sys.argv:
+        problems = check_chart_sizes()
+        for problem in problems:
+            print(f'charts: {problem}')
+        print(f'charts: {"FAILED" if problems else "OK"}')
+        failed = bool(problems)
+        df = synthetic_orders(200_000, seed=1)
+        cube = SalesCube.from_frame(df)
+        problems = check_cube(df, cube)
+        for problem in problems:
+            print(f'synthetic: {problem}')
+        print(f'synthetic: {len(cube.cells)} cells, {"FAILED" if problems else "OK"}')
+        failed = failed or bool(problems)
+        for name in ['all_details', 'orders_all']:
+            if not os.path.exists(csv_path(name)):
+                continue
+            problems = check_cube(shared_table(name), shared_cube(name))
+            for problem in problems:
+                print(f'{name}: {problem}')
+            print(f'{name}: {len(shared_cube(name).cells)} cells, {"FAILED" if problems else "OK"}')
+            failed = failed or bool(problems)
+        sys.exit(1 if failed else 0)
+
+    if '--sessions' in sys.argv:
+        i = sys.argv.index('--sessions') + 1
+        sessions = int(sys.argv[i]) if i < len(sys.argv) else 5
+        for name in ['all_details', 'orders_all']:
+            if os.path.exists(csv_path(name)):
+                benchmark_sessions(name, sessions)
+        sys.exit(0)
+
+    if '--bench' in sys.argv:
+        i = sys.argv.index('--rows') + 1 if '--rows' in sys.argv else len(sys.argv)
+        benchmark_date_index(int(sys.argv[i]) if i < len(sys.argv) else 10_000_000)
+
+    for name in TABLES:
+        if not os.path.exists(csv_path(name)):
+            continue
+        if '--bench' not in sys.argv:
+            build_table(name)
+            print(f'Built {parquet_path(name)}')
+            continue
+
+        start = time.perf_counter()
+        df = pd.read_csv(csv_path(name), low_memory=False)
+        for col in DATE_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], errors='coerce')
+        csv_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        build_table(name)
+        cold_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        load_table(name)
+        warm_time = time.perf_counter() - start
+
+        print(f'{name}: csv + to_datetime {csv_time:.3f}s, cold build {cold_time:.3f}s, warm load {warm_time:.3f}s')
@@ -1,13 +1,8 @@
-import sqlite3
-import hashlib
-
-# Function to hash passwords
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+from pages.db import connect, hash_password
 
 # Function to validate login
 def validate_login(email, password):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('SELECT * FROM users WHERE email = ? AND password = ?', (email, hash_password(password)))
     user = c.fetchone()
@@ -19,7 +14,7 @@ def validate_login(email, password):
 
 # Function to log out the user
 def logout_user(email):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('UPDATE users SET state = 0 WHERE email = ?', (email,))
     conn.commit()
@@ -1,9 +1,9 @@
 import streamlit as st
 import pandas as pd
 from dotenv import load_dotenv
+from pages.db import fetch_logged_in_user
 load_dotenv()
 import os
-import sqlite3
 import google.generativeai as genai
 
 st.set_page_config(
@@ -13,15 +13,6 @@ st.set_page_config(
     initial_sidebar_state="auto",
 )
 
-# Function to fetch logged-in user's information
-def fetch_logged_in_user():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE state = 1')
-    user = c.fetchone()
-    conn.close()
-    return user
-
 # Check if user is logged in
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     user = fetch_logged_in_user()
@@ -216,6 +207,7 @@ else:
 import time
 from code_editor import code_editor
 from pages.vannapp import *
+from pages.chat_stages import StageTimer, fan_out, post_query_stages
 
 st.sidebar.title("Output Settings")
 st.sidebar.checkbox("Show SQL", value=False, key="show_sql")
@@ -224,6 +216,7 @@ st.sidebar.checkbox("Show Plotly Code", value=False, key="show_plotly_code")
 st.sidebar.checkbox("Show Chart", value=True, key="show_chart")
 st.sidebar.checkbox("Show Summary", value=True, key="show_summary")
 st.sidebar.checkbox("Show Follow-up Questions", value=True, key="show_followup")
+st.sidebar.checkbox("Show Timings", value=False, key="show_timings")
 st.sidebar.button("Reset", on_click=lambda: set_question(None), use_container_width=True)
 
 # Dashboard title and subtitle
@@ -238,6 +231,8 @@ st.markdown("<br><br>", unsafe_allow_html=True)
 def set_question(question):
     st.session_state["my_question"] = question
 
+STAGE_LABELS = {"chart": "the chart", "summary": "the summary", "followup": "the follow-up questions"}
+
 avatar_url = "🤖"
 assistant_message_suggested = st.chat_message(
     "assistant", avatar= avatar_url
@@ -266,7 +261,9 @@ if my_question:
     user_message = st.chat_message("user")
     user_message.write(f"{my_question}")
 
-    sql = generate_sql_cached(question=my_question)
+    timer = StageTimer()
+    with timer.step("query", "sql"):
+        sql = generate_sql_cached(question=my_question)
 
     if sql:
         if is_sql_valid_cached(sql=sql):
@@ -282,7 +279,8 @@ if my_question:
             assistant_message.write(sql)
             st.stop()
 
-        df = run_sql_cached(sql=sql)
+        with timer.step("query", "run_sql"):
+            df = run_sql_cached(sql=sql)
 
         if df is not None:
             st.session_state["df"] = df
@@ -300,57 +298,84 @@ if my_question:
                 else:
                     assistant_message_table.dataframe(df)
 
-            if should_generate_chart_cached(question=my_question, sql=sql, df=df):
-
-                code = generate_plotly_code_cached(question=my_question, sql=sql, df=df)
-
-                if st.session_state.get("show_plotly_code", False):
-                    assistant_message_plotly_code = st.chat_message(
-                        "assistant",
-                        avatar=avatar_url,
-                    )
-                    assistant_message_plotly_code.code(
-                        code, language="python", line_numbers=True
-                    )
+            # Chart, summary and follow-up questions run concurrently; each one replaces its
+            # placeholder as soon as it is ready, in whatever order they finish
+            df = st.session_state.get("df")
+            show_chart = st.session_state.get("show_chart", True)
+            show_plotly_code = st.session_state.get("show_plotly_code", False)
+            shown = dict(
+                chart=show_chart or show_plotly_code,
+                plot=show_chart,
+                summary=st.session_state.get("show_summary", True),
+                followup=st.session_state.get("show_followup", True),
+            )
+            stages = post_query_stages(background_vanna(my_question, sql, df, **shown), my_question, sql, df, timer, **shown)
+            slots = {name: st.empty() for name in stages}
+            for name, slot in slots.items():
+                slot.caption(f"Generating {STAGE_LABELS[name]} ...")
+
+            for name, value, error in fan_out(stages):
+                with slots[name].container():
+                    if name == "followup":
+                        st.session_state["df"] = None
+
+                    if isinstance(error, TimeoutError):
+                        st.chat_message("assistant", avatar=avatar_url).warning(
+                            f"Generating {STAGE_LABELS[name]} took too long. Ask again in a moment to see it."
+                        )
+                    elif error is not None:
+                        st.chat_message("assistant", avatar=avatar_url).error(
+                            f"I couldn't generate {STAGE_LABELS[name]}: {error}"
+                        )
 
-                if code is not None and code != "":
-                    if st.session_state.get("show_chart", True):
-                        assistant_message_chart = st.chat_message(
+                    elif name == "chart":
+                        code, fig = value
+                        if show_plotly_code and code:
+                            assistant_message_plotly_code = st.chat_message(
+                                "assistant",
+                                avatar=avatar_url,
+                            )
+                            assistant_message_plotly_code.code(
+                                code, language="python", line_numbers=True
+                            )
+
+                        if code is not None and code != "" and show_chart:
+                            assistant_message_chart = st.chat_message(
+                                "assistant",
+                                avatar=avatar_url,
+                            )
+                            if fig is not None:
+                                assistant_message_chart.plotly_chart(fig)
+                            else:
+                                assistant_message_chart.error("I couldn't generate a chart")
+
+                    elif name == "summary":
+                        assistant_message_summary = st.chat_message(
                             "assistant",
                             avatar=avatar_url,
                         )
-                        fig = generate_plot_cached(code=code, df=df)
-                        if fig is not None:
-                            assistant_message_chart.plotly_chart(fig)
-                        else:
-                            assistant_message_chart.error("I couldn't generate a chart")
-
-            if st.session_state.get("show_summary", True):
-                assistant_message_summary = st.chat_message(
-                    "assistant",
-                    avatar=avatar_url,
-                )
-                summary = generate_summary_cached(question=my_question, df=df)
-                if summary is not None:
-                    assistant_message_summary.text(summary)
+                        if value is not None:
+                            assistant_message_summary.text(value)
 
-            if st.session_state.get("show_followup", True):
-                assistant_message_followup = st.chat_message(
-                    "assistant",
-                    avatar=avatar_url,
-                )
-                followup_questions = generate_followup_cached(
-                    question=my_question, sql=sql, df=df
-                )
-                st.session_state["df"] = None
-
-                if len(followup_questions) > 0:
-                    assistant_message_followup.text(
-                        "Here are some possible follow-up questions"
-                    )
-                    # Print the first 5 follow-up questions
-                    for question in followup_questions[:5]:
-                        assistant_message_followup.button(question, on_click=set_question, args=(question,))
+                    elif name == "followup":
+                        assistant_message_followup = st.chat_message(
+                            "assistant",
+                            avatar=avatar_url,
+                        )
+                        followup_questions = value or []
+
+                        if len(followup_questions) > 0:
+                            assistant_message_followup.text(
+                                "Here are some possible follow-up questions"
+                            )
+                            # Print the first 5 follow-up questions
+                            for question in followup_questions[:5]:
+                                assistant_message_followup.button(question, on_click=set_question, args=(question,))
+
+            if st.session_state.get("show_timings", False):
+                with st.expander("Timings"):
+                    st.caption(timer.summary())
+                    st.dataframe(timer.frame(), hide_index=True)
 
             # Add a "New Question" button to reset the question
             st.markdown(f"""
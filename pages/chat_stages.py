@@ -0,0 +1,233 @@
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Concurrent post-query stages of the SaleChat page.
+#
+# Once the SQL result is in, the chart (chart decision -> Plotly code -> figure), the summary and
+# the follow-up questions only depend on that result, so they run side by side on a shared thread
+# pool and the page renders each as soon as it finishes. A stage still running after its timeout
+# is reported as timed out; its thread finishes in the background and still fills the disk cache.
+#
+# Nothing here touches streamlit: stages run off the script thread and the page does all rendering.
+
+STAGE_TIMEOUTS = {
+    'chart': float(os.environ.get('SUPERSALES_CHAT_CHART_TIMEOUT', 60)),
+    'summary': float(os.environ.get('SUPERSALES_CHAT_SUMMARY_TIMEOUT', 45)),
+    'followup': float(os.environ.get('SUPERSALES_CHAT_FOLLOWUP_TIMEOUT', 45)),
+}
+CHAT_STAGE_WORKERS = int(os.environ.get('SUPERSALES_CHAT_STAGE_WORKERS', 8))
+
+
+class StageTimer:
+    # Start and end of every step, grouped by branch. The 'query' branch (SQL generation and the
+    # query itself) runs first on the script thread; every other branch runs concurrently after it.
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.steps = []  # (branch, step, start, end) in seconds since origin
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, branch, name):
+        start = time.perf_counter() - self.origin
+        try:
+            yield
+        finally:
+            end = time.perf_counter() - self.origin
+            with self._lock:
+                self.steps.append((branch, name, start, end))
+
+    # Function to get the steps that decided the total time: the query steps, then the branch that finished last
+    def critical_path(self):
+        with self._lock:
+            steps = sorted(self.steps, key=lambda s: s[2])
+        query = [s for s in steps if s[0] == 'query']
+        branches = {}
+        for s in steps:
+            if s[0] != 'query':
+                branches.setdefault(s[0], []).append(s)
+        slowest = max(branches.values(), key=lambda b: max(s[3] for s in b), default=[])
+        return query + slowest
+
+    def frame(self):
+        import pandas as pd
+        path = set(self.critical_path())
+        with self._lock:
+            steps = sorted(self.steps, key=lambda s: s[2])
+        return pd.DataFrame([{
+            'branch': branch,
+            'step': name,
+            'start_ms': start * 1000,
+            'duration_ms': (end - start) * 1000,
+            'critical_path': (branch, name, start, end) in path,
+        } for branch, name, start, end in steps])
+
+    def summary(self):
+        path = self.critical_path()
+        if not path:
+            return ''
+        with self._lock:
+            busy = sum(end - start for _, _, start, end in self.steps)
+        total = max(end for _, _, _, end in path)
+        steps = ' → '.join(name for _, name, _, _ in path)
+        return f'Critical path: {steps} ({total:.2f} s; {busy:.2f} s if run one after another)'
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Function to get the process-wide stage pool. It is never shut down per request, so a timed-out
+# stage does not hold up the page while it finishes.
+def stage_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=CHAT_STAGE_WORKERS, thread_name_prefix='chat-stage')
+        return _executor
+
+# Function to run stages (name -> callable) concurrently, yielding (name, value, error) as each
+# finishes or times out, in completion order
+def fan_out(stages, timeouts=STAGE_TIMEOUTS, executor=None):
+    executor = executor or stage_executor()
+    start = time.monotonic()
+    limits = {name: timeouts.get(name, max(STAGE_TIMEOUTS.values())) for name in stages}
+    futures = {executor.submit(run): name for name, run in stages.items()}
+    deadlines = {future: start + limits[name] for future, name in futures.items()}
+    pending = set(futures)
+    while pending:
+        now = time.monotonic()
+        for future in [f for f in pending if deadlines[f] <= now and not f.done()]:
+            pending.discard(future)
+            future.cancel()
+            name = futures[future]
+            yield name, None, TimeoutError(f'{name} took longer than {limits[name]:g} s')
+        if not pending:
+            break
+        done, _ = wait(pending, timeout=max(0.0, min(deadlines[f] for f in pending) - now),
+                       return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.discard(future)
+            error = future.exception()
+            yield futures[future], None if error else future.result(), error
+
+# Function to get the stage callables for one answer. chat is a CachedVanna; chart/summary/followup
+# say which outputs the page shows, plot whether the figure itself is needed (not just its code).
+def post_query_stages(chat, question, sql, df, timer, chart=True, plot=True, summary=True, followup=True):
+    stages = {}
+
+    def chart_stage():
+        with timer.step('chart', 'should_generate_chart'):
+            if not chat.should_generate_chart(df):
+                return None, None
+        with timer.step('chart', 'plotly_code'):
+            code = chat.generate_plotly_code(question, sql, df)
+        if not code or not plot:
+            return code, None
+        with timer.step('chart', 'plot'):
+            return code, chat.get_plotly_figure(code, df)
+
+    def summary_stage():
+        with timer.step('summary', 'summary'):
+            return chat.generate_summary(question, df)
+
+    def followup_stage():
+        with timer.step('followup', 'followup'):
+            return chat.generate_followup_questions(question, sql, df)
+
+    if chart:
+        stages['chart'] = chart_stage
+    if summary:
+        stages['summary'] = summary_stage
+    if followup:
+        stages['followup'] = followup_stage
+    return stages
+
+# Function to answer one question, one stage after another or fanned out; returns
+# (timer, {stage: value or error})
+def answer(chat, question, timeouts=STAGE_TIMEOUTS, concurrent=True):
+    timer = StageTimer()
+    with timer.step('query', 'sql'):
+        sql = chat.generate_sql(question)
+    with timer.step('query', 'run_sql'):
+        df = chat.run_sql(sql)
+    stages = post_query_stages(chat, question, sql, df, timer)
+    results = {}
+    if concurrent:
+        for name, value, error in fan_out(stages, timeouts):
+            results[name] = error or value
+    else:
+        for name, run in stages.items():
+            try:
+                results[name] = run()
+            except Exception as e:
+                results[name] = e
+    return timer, results
+
+# Function to compare sequential and fanned-out stages against FakeVanna with latency seconds per
+# LLM call, each on a cold cache; returns the problems found
+def check_fan_out(directory, latency):
+    import sqlite3
+    from pages.vanna_cache import CachedVanna, DiskCache, FakeVanna
+    problems = []
+    db_path = os.path.join(directory, 'orders.db')
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('CREATE TABLE orders (order_id TEXT, price REAL)')
+        conn.executemany('INSERT INTO orders VALUES (?, ?)', [(f'o{i}', float(i)) for i in range(20)])
+    question = 'What are the top 5 orders with the highest price?'
+
+    def cold(name):
+        vn = FakeVanna(db_path, latency)
+        return CachedVanna(lambda: vn, db_path, DiskCache(os.path.join(directory, f'{name}.db')))
+
+    runs = {}
+    for label, concurrent in [('sequential', False), ('concurrent', True)]:
+        start = time.perf_counter()
+        timer, results = answer(cold(label), question, concurrent=concurrent)
+        runs[label] = time.perf_counter() - start
+        print(f'{label}: {runs[label]:.2f} s')
+        for name, value in results.items():
+            if isinstance(value, Exception):
+                print(f'  {name}: {value!r}')
+        print(f'  {timer.summary()}')
+    # sql, run_sql then three LLM calls one after another, against sql, run_sql and the slowest branch
+    if runs['concurrent'] > runs['sequential'] - 1.5 * latency:
+        problems.append(f"concurrent {runs['concurrent']:.2f} s is not faster than sequential {runs['sequential']:.2f} s")
+    if [s[1] for s in timer.critical_path()][:2] != ['sql', 'run_sql']:
+        problems.append(f'critical path does not start with the query: {timer.summary()}')
+
+    # A stage over its timeout is reported as soon as the timeout passes; the others still complete
+    timeouts = {**STAGE_TIMEOUTS, 'summary': latency / 3}
+    start = time.perf_counter()
+    seen = []
+    timer = StageTimer()
+    chat = cold('timeout')
+    sql = chat.generate_sql(question)
+    df = chat.run_sql(sql)
+    for name, value, error in fan_out(post_query_stages(chat, question, sql, df, timer, chart=False), timeouts):
+        seen.append((name, type(error).__name__ if error else 'ok', time.perf_counter() - start))
+    print(f'timeouts: {seen}')
+    if not seen or seen[0][:2] != ('summary', 'TimeoutError') or seen[0][2] > 2 * latency:
+        problems.append(f'summary timeout not reported first and early: {seen}')
+    if ('followup', 'ok') not in [s[:2] for s in seen]:
+        problems.append(f'followup did not complete alongside the timed-out summary: {seen}')
+    return problems
+
+
+if __name__ == '__main__':
+    # python -m pages.chat_stages --check [--latency S]
+    #     answer one question against FakeVanna with S seconds (default 0.5) per LLM call,
+    #     sequentially and fanned out, and check timeouts and the critical path
+    import tempfile
+    i = sys.argv.index('--latency') + 1 if '--latency' in sys.argv else len(sys.argv)
+    latency = float(sys.argv[i]) if i < len(sys.argv) else 0.5
+    with tempfile.TemporaryDirectory() as directory:
+        problems = check_fan_out(directory, latency)
+    for problem in problems:
+        print(problem)
+    print('FAILED' if problems else 'OK')
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,424 @@
+import os
+import sys
+import time
+import queue
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from pages.migrations import migrate
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Shared data-access layer for every page.
+#
+# Streamlit imports this module once per server process, so the pool below is shared by all
+# sessions. Each rerun runs on its own script-runner thread and borrows a connection for the
+# duration of a helper call instead of opening and closing a fresh one.
+
+DB_PATH = os.environ.get('SUPERSALES_DB_PATH', 'users.db')
+
+# Roughly the number of script-runner threads expected to hit the database at the same time
+POOL_SIZE = int(os.environ.get('SUPERSALES_DB_POOL_SIZE', 8))
+
+# Per-connection prepared statement cache (sqlite3 reuses compiled statements by SQL text)
+STATEMENT_CACHE_SIZE = 256
+
+
+class ConnectionPool:
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    # Borrow a connection; never blocks, opens an extra one if every pooled connection is busy
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        return PooledConnection(self, conn)
+
+    # Give a connection back, discarding anything left uncommitted
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class PooledConnection:
+    # Behaves like sqlite3.Connection, but close() hands the connection back to the pool.
+    # Used as a context manager it commits (or rolls back on error) and then releases.
+    _conn = None
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._conn is not None:
+            if exc_type is None:
+                self._conn.commit()
+            else:
+                self._conn.rollback()
+        self.close()
+        return False
+
+    def __del__(self):
+        self.close()
+
+
+pool = ConnectionPool(DB_PATH, POOL_SIZE)
+
+# Bring the schema up to date once per process, before any page queries it
+_conn = pool.acquire()
+migrate(_conn)
+_conn.close()
+del _conn
+
+# Function to borrow a pooled connection (drop-in for sqlite3.connect('users.db'))
+def connect():
+    return pool.acquire()
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Helpers shared by the pages
+
+# Function to hash passwords
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+# Function to fetch logged-in user's information
+def fetch_logged_in_user():
+    with connect() as conn:
+        return conn.execute('SELECT * FROM users WHERE state = 1').fetchone()
+
+# Function to update user state in the database
+def update_user_state(username, state):
+    with connect() as conn:
+        conn.execute('UPDATE users SET state = ? WHERE username = ?', (state, username))
+
+def fetch_user_designation(username):
+    with connect() as conn:
+        return conn.execute('SELECT designation FROM users WHERE username = ?', (username,)).fetchone()[0]
+
+# Function to get cart count
+def get_cart_count(user_id):
+    with connect() as conn:
+        count = conn.execute('SELECT SUM(quantity) FROM shopping_cart WHERE user_id = ?', (user_id,)).fetchone()[0]
+    return count if count else 0
+
+# Cart membership is cached per user so the product grid can check every tile in memory.
+# Every write to shopping_cart goes through the helpers below, which invalidate the entry.
+_cart_ids = {}
+_cart_versions = {}
+_cart_lock = threading.Lock()
+
+def invalidate_cart(user_id):
+    with _cart_lock:
+        _cart_ids.pop(user_id, None)
+        _cart_versions[user_id] = _cart_versions.get(user_id, 0) + 1
+
+# Function to fetch the set of product ids in the user's cart with a single query
+def fetch_cart_product_ids(user_id):
+    with _cart_lock:
+        ids = _cart_ids.get(user_id)
+        version = _cart_versions.get(user_id, 0)
+    if ids is not None:
+        return ids
+
+    with connect() as conn:
+        rows = conn.execute('SELECT product_id FROM shopping_cart WHERE user_id = ?', (user_id,)).fetchall()
+    ids = frozenset(row[0] for row in rows)
+
+    # Don't cache a result that raced with a concurrent cart write
+    with _cart_lock:
+        if _cart_versions.get(user_id, 0) == version:
+            _cart_ids[user_id] = ids
+    return ids
+
+def add_to_cart(user_id, product_id, quantity):
+    with connect() as conn:
+        conn.execute('''
+            INSERT INTO shopping_cart (user_id, product_id, quantity)
+            VALUES (?, ?, ?)
+        ''', (user_id, product_id, quantity))
+    invalidate_cart(user_id)
+
+def remove_from_cart(user_id, product_id):
+    with connect() as conn:
+        conn.execute('''
+            DELETE FROM shopping_cart WHERE user_id = ? AND product_id = ?
+        ''', (user_id, product_id))
+    invalidate_cart(user_id)
+
+def clear_cart(user_id):
+    with connect() as conn:
+        conn.execute('DELETE FROM shopping_cart WHERE user_id = ?', (user_id,))
+    invalidate_cart(user_id)
+
+class OutOfStockError(Exception):
+    def __init__(self, product_id, product_name):
+        super().__init__(f'Not enough stock for product {product_id}')
+        self.product_id = product_id
+        self.product_name = product_name
+
+# Function to place orders for everything in the user's cart.
+# Stock is decremented only where enough is left (NULL quantity means stock is not tracked);
+# if any item falls short the whole checkout is rolled back and OutOfStockError is raised.
+def checkout(customer_id, address, phone, total_charge, payment_method, order_status='Processing'):
+    conn = connect()
+    try:
+        # Take the write lock up front so concurrent buyers queue instead of deadlocking
+        conn.execute('BEGIN IMMEDIATE')
+        items = conn.execute('''
+            SELECT c.product_id, p.seller_id, c.quantity, p.product_name
+            FROM shopping_cart c
+            JOIN products p ON c.product_id = p.product_id
+            WHERE c.user_id = ?
+        ''', (customer_id,)).fetchall()
+
+        for product_id, seller_id, quantity, product_name in items:
+            updated = conn.execute('''
+                UPDATE products SET quantity = quantity - ?
+                WHERE product_id = ? AND (quantity IS NULL OR quantity >= ?)
+            ''', (quantity, product_id, quantity)).rowcount
+            if updated != 1:
+                raise OutOfStockError(product_id, product_name)
+
+        order_purchase_timestamp = datetime.now()
+        conn.executemany('''
+            INSERT INTO orders (customer_id, seller_id, product_id, order_status, address, phone, total_charge, payment_method, order_purchase_timestamp, quantity)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(customer_id, seller_id, product_id, order_status, address, phone, total_charge, payment_method, order_purchase_timestamp, quantity)
+              for product_id, seller_id, quantity, _ in items])
+
+        conn.execute('DELETE FROM shopping_cart WHERE user_id = ?', (customer_id,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+        invalidate_cart(customer_id)
+    return len(items)
+
+def is_in_cart(user_id, product_id):
+    return product_id in fetch_cart_product_ids(user_id)
+
+# Function to fetch cart items for the logged-in user
+def fetch_cart_items(user_id):
+    with connect() as conn:
+        return conn.execute('''
+            SELECT p.product_id, p.seller_id, p.product_category, p.product_name, p.product_brand,
+                   p.product_weight_g, p.product_length_cm, p.product_width_cm, p.product_height_cm,
+                   p.price, c.quantity, p.image1
+            FROM shopping_cart c
+            JOIN products p ON c.product_id = p.product_id
+            WHERE c.user_id = ?
+        ''', (user_id,)).fetchall()
+
+def calculate_total_price(user_id):
+    with connect() as conn:
+        items = conn.execute('''
+            SELECT p.price, c.quantity
+            FROM shopping_cart c
+            JOIN products p ON c.product_id = p.product_id
+            WHERE c.user_id = ?
+        ''', (user_id,)).fetchall()
+
+    total_price = sum(price * quantity for price, quantity in items)
+    return total_price
+
+# Function to fetch image blobs only for the given products (the tiles actually on screen)
+def fetch_product_images(product_ids):
+    if not product_ids:
+        return {}
+    placeholders = ', '.join('?' for _ in product_ids)
+    with connect() as conn:
+        rows = conn.execute(f'''
+            SELECT product_id, image1, image2, image3 FROM products
+            WHERE product_id IN ({placeholders})
+        ''', list(product_ids)).fetchall()
+    return {row[0]: row[1:] for row in rows}
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Checks and benchmarks against a scratch database (python -m pages.db --check / --bench)
+
+# Function to point this process's pool at another database file, migrated to the latest schema
+def use_database(path):
+    global pool
+    pool.close_all()
+    pool = ConnectionPool(path, POOL_SIZE)
+    conn = pool.acquire()
+    migrate(conn)
+    conn.close()
+
+# Function to fill a scratch database with one logged-in customer, a catalog and a partly full cart
+def _seed_catalog(products, cart_items):
+    with connect() as conn:
+        conn.execute("INSERT INTO users (id, username, email, state, designation) VALUES (1, 'seller', 's@x', 0, 'Seller')")
+        conn.execute("INSERT INTO users (id, username, email, state, designation) VALUES (2, 'buyer', 'b@x', 1, 'Customer')")
+        conn.executemany('''
+            INSERT INTO products (product_id, seller_id, product_category, product_name, price, quantity)
+            VALUES (?, 1, ?, ?, ?, 100)
+        ''', [(i, f'category {i % 10}', f'product {i}', 10.0 + i) for i in range(1, products + 1)])
+        conn.executemany('INSERT INTO shopping_cart (user_id, product_id, quantity) VALUES (2, ?, 1)',
+                         [(i,) for i in range(1, cart_items + 1)])
+
+# Function to run the queries of one user_products.py render the way the pages did before the
+# pool: a new connection per helper call and one more per product tile; returns connections opened
+def _render_grid_before(path, username, user_id):
+    opened = 0
+
+    def query(sql, params=()):
+        nonlocal opened
+        conn = sqlite3.connect(path)
+        opened += 1
+        rows = conn.execute(sql, params).fetchall()
+        conn.close()
+        return rows
+
+    query('SELECT * FROM users WHERE state = 1')
+    query('SELECT designation FROM users WHERE username = ?', (username,))
+    products = query('SELECT * FROM products')
+    query('SELECT SUM(quantity) FROM shopping_cart WHERE user_id = ?', (user_id,))
+    for product in products:
+        query('SELECT * FROM shopping_cart WHERE user_id = ? AND product_id = ?', (user_id, product[0]))
+    return opened
+
+# Function to run the same render through the pooled helpers, with all tiles on one page
+def _render_grid_after(username, user_id, page_size):
+    fetch_logged_in_user()
+    fetch_user_designation(username)
+    with connect() as conn:
+        products = conn.execute('''
+            SELECT product_id, seller_id, product_category, product_name, product_brand,
+                   product_weight_g, product_length_cm, product_width_cm, product_height_cm,
+                   price, quantity
+            FROM products WHERE product_id > ? ORDER BY product_id LIMIT ?
+        ''', (0, page_size + 1)).fetchall()
+    fetch_product_images([product[0] for product in products])
+    get_cart_count(user_id)
+    # Worst case for the pool: the cart cache is cold on every render
+    invalidate_cart(user_id)
+    for product in products[:page_size]:
+        is_in_cart(user_id, product[0])
+
+# Function to print connections opened and p50/p99 render latency of the product grid, before and after the pool
+def benchmark_grid(directory, products=500, renders=200):
+    import numpy as np
+    path = os.path.join(directory, 'bench.db')
+    use_database(path)
+    _seed_catalog(products, cart_items=products // 10)
+    for label in ['before', 'after']:
+        opened_before = pool.opened
+        opened, times = 0, []
+        for _ in range(renders):
+            start = time.perf_counter()
+            if label == 'before':
+                opened += _render_grid_before(path, 'buyer', 2)
+            else:
+                _render_grid_after('buyer', 2, products)
+            times.append(time.perf_counter() - start)
+        if label == 'after':
+            opened = pool.opened - opened_before
+        print(f'{label}: {opened / renders:.1f} connection(s) opened per render, '
+              f'p50 {np.percentile(times, 50) * 1000:.1f} ms, p99 {np.percentile(times, 99) * 1000:.1f} ms')
+
+# Function to race buyers through checkout for the last units of one product; returns the problems found
+def check_checkout(directory, buyers=50, stock=20):
+    use_database(os.path.join(directory, 'check.db'))
+    with connect() as conn:
+        conn.execute("INSERT INTO users (id, username, email, designation) VALUES (1, 'seller', 's@x', 'Seller')")
+        conn.execute("INSERT INTO products (product_id, seller_id, product_name, price, quantity) VALUES (1, 1, 'last units', 10.0, ?)",
+                     (stock,))
+        conn.executemany("INSERT INTO users (id, username, email, designation) VALUES (?, ?, ?, 'Customer')",
+                         [(i, f'buyer{i}', f'b{i}@x') for i in range(2, buyers + 2)])
+        conn.executemany('INSERT INTO shopping_cart (user_id, product_id, quantity) VALUES (?, 1, 1)',
+                         [(i,) for i in range(2, buyers + 2)])
+
+    barrier = threading.Barrier(buyers)
+    outcomes, errors = [], []
+
+    def buy(user_id):
+        barrier.wait()
+        try:
+            checkout(user_id, 'address', 'phone', 10.0, 'Card')
+            outcomes.append(True)
+        except OutOfStockError:
+            outcomes.append(False)
+        except Exception as e:
+            errors.append(repr(e))
+
+    threads = [threading.Thread(target=buy, args=(user_id,)) for user_id in range(2, buyers + 2)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    with connect() as conn:
+        left = conn.execute('SELECT quantity FROM products WHERE product_id = 1').fetchone()[0]
+        orders = conn.execute('SELECT COUNT(*) FROM orders WHERE product_id = 1').fetchone()[0]
+    print(f'{buyers} buyers, {stock} in stock: {sum(outcomes)} checkouts succeeded, {outcomes.count(False)} out of stock, '
+          f'{len(outcomes) / elapsed:,.0f} checkouts/s, {orders / elapsed:,.0f} orders/s')
+    problems = [f'checkout raised {error}' for error in errors]
+    if left < 0:
+        problems.append(f'stock went negative: {left}')
+    if orders != stock or sum(outcomes) != stock:
+        problems.append(f'{orders} order(s) and {sum(outcomes)} successful checkout(s) for {stock} units')
+    if left != stock - orders:
+        problems.append(f'{left} left after {orders} order(s) from {stock}')
+    return problems
+
+
+if __name__ == '__main__':
+    # python -m pages.db --check  50 buyers race checkout for the last 20 units of a product
+    # python -m pages.db --bench  render the 500-product grid with per-call connections and with the pool
+    import tempfile
+    if '--check' in sys.argv:
+        with tempfile.TemporaryDirectory() as directory:
+            problems = check_checkout(directory)
+            pool.close_all()
+        for problem in problems:
+            print(problem)
+        print('FAILED' if problems else 'OK')
+        sys.exit(1 if problems else 0)
+    if '--bench' in sys.argv:
+        with tempfile.TemporaryDirectory() as directory:
+            benchmark_grid(directory)
+            pool.close_all()
@@ -0,0 +1,450 @@
+import os
+import sys
+import time
+import threading
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from pages.db import connect
+from pages.analytics import sales_rollups
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Sales forecasting on the live orders table.
+#
+# Weekly sales (sum of product price per order, like seller_order_summary.total_sales) are fitted
+# with additive Holt-Winters. All smoothing-parameter combinations are run side by side as NumPy
+# arrays, so a fit is one pass over the weeks. A background worker refits whenever the orders
+# table changes (checkout wakes it); pages only read its latest result and never fit anything
+# themselves. When weeks were only appended since the last fit, the fitted level/trend/season
+# state is carried over the new weeks instead of refitting from the first week.
+#
+# Per (seller, product category) forecasts are fitted by a batch job across worker processes and
+# written to the forecasts table, which seller_dashboard.py reads. The same background worker runs
+# the batch whenever orders change or a new week starts; it only refits the series that need it.
+
+SEASON_LENGTH = 52  # weeks
+FORECAST_WEEKS = int(os.environ.get('SUPERSALES_FORECAST_WEEKS', 26))
+POLL_SECONDS = int(os.environ.get('SUPERSALES_FORECAST_POLL_SECONDS', 60))
+# Processes the background worker fits the per-series batch with; 1 fits in the server process
+SERIES_WORKERS = int(os.environ.get('SUPERSALES_SERIES_WORKERS', 1))
+
+ALPHAS = np.linspace(0.05, 0.95, 10)
+BETAS = np.array([0.01, 0.05, 0.1, 0.2, 0.4])
+GAMMAS = np.array([0.01, 0.05, 0.1, 0.2, 0.4])
+PHIS = np.array([0.9, 0.98, 1.0])
+
+
+class HoltWinters:
+    # Additive level + damped trend + seasonality. Series shorter than two seasons are fitted
+    # without the seasonal part.
+
+    def __init__(self, alpha, beta, gamma, phi, level, trend, season, sse, n):
+        self.alpha, self.beta, self.gamma, self.phi = alpha, beta, gamma, phi
+        self.level, self.trend, self.season = level, trend, season
+        self.sse = sse
+        self.n = n
+
+    @classmethod
+    def fit(cls, y, season_length=SEASON_LENGTH, previous=None):
+        y = np.asarray(y, dtype=np.float64)
+        n = len(y)
+        if n < 3:
+            raise ValueError('Need at least 3 points to fit a forecast')
+        seasonal = n >= 2 * season_length
+        m = season_length if seasonal else 1
+
+        if previous is not None:
+            # Incremental refit: search only the neighbourhood of the last fit's parameters
+            grid = list(itertools.product(_around(previous.alpha, ALPHAS), _around(previous.beta, BETAS),
+                                          _around(previous.gamma, GAMMAS) if seasonal else [0.0],
+                                          _around(previous.phi, PHIS)))
+        else:
+            grid = list(itertools.product(ALPHAS, BETAS, GAMMAS if seasonal else [0.0], PHIS))
+        alpha, beta, gamma, phi = (np.array(values) for values in zip(*grid))
+        g = len(grid)
+
+        if seasonal:
+            first, second = y[:m].mean(), y[m:2 * m].mean()
+            level = np.full(g, first)
+            trend = np.full(g, (second - first) / m)
+            season = np.tile(y[:m] - first, (g, 1))
+        else:
+            level = np.full(g, y[0])
+            trend = np.full(g, y[1] - y[0])
+            season = np.zeros((g, 1))
+
+        # One step over time for every parameter combination at once
+        sse = np.zeros(g)
+        for t in range(n):
+            s = season[:, t % m]
+            error = y[t] - (level + phi * trend + s)
+            if t >= m:
+                sse += error * error
+            new_level = alpha * (y[t] - s) + (1 - alpha) * (level + phi * trend)
+            trend = beta * (new_level - level) + (1 - beta) * phi * trend
+            season[:, t % m] = gamma * (y[t] - new_level) + (1 - gamma) * s
+            level = new_level
+
+        best = int(np.argmin(sse))
+        return cls(alpha[best], beta[best], gamma[best], phi[best], level[best], trend[best],
+                   season[best].copy(), sse[best], n)
+
+    # Function to carry the fitted state over weeks appended after the fit, keeping its parameters;
+    # only the new weeks are visited
+    def update(self, y):
+        level, trend, season, sse = self.level, self.trend, self.season.copy(), self.sse
+        alpha, beta, gamma, phi = self.alpha, self.beta, self.gamma, self.phi
+        m = len(season)
+        for t, value in enumerate(np.asarray(y, dtype=np.float64), start=self.n):
+            s = season[t % m]
+            error = value - (level + phi * trend + s)
+            sse += error * error
+            new_level = alpha * (value - s) + (1 - alpha) * (level + phi * trend)
+            trend = beta * (new_level - level) + (1 - beta) * phi * trend
+            season[t % m] = gamma * (value - new_level) + (1 - gamma) * s
+            level = new_level
+        return HoltWinters(alpha, beta, gamma, phi, level, trend, season, sse, self.n + len(y))
+
+    def forecast(self, horizon):
+        steps = np.arange(1, horizon + 1)
+        damped = np.cumsum(self.phi ** steps)
+        m = len(self.season)
+        values = self.level + damped * self.trend + self.season[(self.n + steps - 1) % m]
+        return np.maximum(values, 0)
+
+
+def _around(value, grid):
+    # The grid point nearest to value and its neighbours on either side
+    i = int(np.argmin(np.abs(grid - value)))
+    return grid[max(0, i - 1):i + 2]
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Weekly sales from the orders table
+
+
+# Function to get a cheap fingerprint of the orders table that changes when orders are added or removed
+def orders_version():
+    with connect() as conn:
+        return conn.execute('SELECT COUNT(*), MAX(order_id) FROM orders').fetchone()
+
+# Function to get total sales per week (weeks start on Monday), with empty weeks as 0
+def weekly_sales():
+    with connect() as conn:
+        rows = conn.execute('''
+            SELECT date(o.order_purchase_timestamp, 'weekday 0', '-6 days') AS week, SUM(COALESCE(p.price, 0))
+            FROM orders o
+            LEFT JOIN products p ON o.product_id = p.product_id
+            WHERE o.order_purchase_timestamp IS NOT NULL
+            GROUP BY week
+            ORDER BY week
+        ''').fetchall()
+    return _complete_weeks(pd.Series([total for _, total in rows], index=pd.to_datetime([week for week, _ in rows]), dtype=np.float64))
+
+def _complete_weeks(sales):
+    if sales.empty:
+        return sales
+    sales = sales.reindex(pd.date_range(sales.index[0], sales.index[-1], freq='W-MON'), fill_value=0.0)
+    # The current week is still filling up and would drag the forecast down
+    return sales[sales.index < _this_week()]
+
+def _this_week():
+    now = datetime.now()
+    return pd.Timestamp(now).normalize() - pd.Timedelta(days=now.weekday())
+
+
+class Forecast:
+    def __init__(self, version, history, predicted, model, fit_seconds):
+        self.version = version
+        self.history = history  # actual weekly sales
+        self.predicted = predicted  # forecast weekly sales, starting the week after history
+        self.model = model
+        self.fit_seconds = fit_seconds
+        self.fitted_at = datetime.now()
+        self._rollups = None
+
+    # Function to get one frame of actual then predicted weeks, shaped like the analytics tables
+    def frame(self):
+        return pd.DataFrame({
+            'order_purchase_timestamp': self.history.index.append(self.predicted.index),
+            'price': np.concatenate([self.history.to_numpy(), self.predicted.to_numpy()]),
+        })
+
+    # Function to get the weekly/monthly/yearly totals of frame(), computed once per forecast
+    def rollups(self):
+        if self._rollups is None:
+            self._rollups = sales_rollups(self.frame())
+        return self._rollups
+
+# Function to tell whether history is previous with weeks appended, fitted the same way (seasonal or not)
+def _extends(previous, history):
+    n = len(previous)
+    return (n <= len(history) and history.index[0] == previous.index[0]
+            and (n >= 2 * SEASON_LENGTH) == (len(history) >= 2 * SEASON_LENGTH)
+            and np.array_equal(history.to_numpy()[:n], previous.to_numpy()))
+
+# Function to fit the weekly sales and forecast the following weeks. previous is the last
+# Forecast: its model is updated on the appended weeks, or, if earlier weeks changed, its
+# parameters narrow the search of a full refit.
+def build_forecast(history, version=None, previous=None, horizon=FORECAST_WEEKS):
+    start = time.perf_counter()
+    if previous is not None and _extends(previous.history, history):
+        model = previous.model.update(history.to_numpy()[len(previous.history):])
+    else:
+        model = HoltWinters.fit(history.to_numpy(), previous=previous.model if previous is not None else None)
+    fit_seconds = time.perf_counter() - start
+    index = pd.date_range(history.index[-1] + pd.Timedelta(weeks=1), periods=horizon, freq='W-MON')
+    return Forecast(version, history, pd.Series(model.forecast(horizon), index=index), model, fit_seconds)
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Background refits, one worker per server process
+
+
+class ForecastWorker(threading.Thread):
+    def __init__(self, poll_seconds=POLL_SECONDS, series_workers=SERIES_WORKERS):
+        super().__init__(name='forecast-worker', daemon=True)
+        self.poll_seconds = poll_seconds
+        self.series_workers = series_workers
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._latest = None
+        self._series_version = None
+        self.error = None
+
+    def latest(self):
+        with self._lock:
+            return self._latest
+
+    # Function to ask for a version check now instead of at the next poll
+    def wake(self):
+        self._wake.set()
+
+    def run(self):
+        while True:
+            for step in (self.refresh, self.refresh_series):
+                try:
+                    step()
+                except Exception as e:
+                    # Keep serving the last good forecasts; try again at the next poll
+                    self.error = e
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def refresh(self):
+        version = orders_version()
+        latest = self.latest()
+        if latest is not None and latest.version == version:
+            return latest
+        history = weekly_sales()
+        if len(history) < 3:
+            return latest
+        forecast = build_forecast(history, version, previous=latest)
+        with self._lock:
+            self._latest = forecast
+        self.error = None
+        return forecast
+
+    # Function to run the per-series batch when orders changed or a new week started since its last run
+    def refresh_series(self):
+        version = (orders_version(), _this_week())
+        if version == self._series_version:
+            return
+        run_batch_forecasts(self.series_workers)
+        self._series_version = version
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+# Function to get the process-wide forecast worker, starting it on first use
+def forecast_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = ForecastWorker()
+            _worker.start()
+        return _worker
+
+# Function to get the most recent forecast, or None while the first fit is still running
+def latest_forecast():
+    return forecast_worker().latest()
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Batch forecasts per (seller, product category), fitted across worker processes
+
+SERIES_FORECAST_WEEKS = int(os.environ.get('SUPERSALES_SERIES_FORECAST_WEEKS', 12))
+MIN_SERIES_WEEKS = 4
+
+
+# Function to fit one series; runs in a worker process, so it only takes and returns plain data
+def _fit_series(task):
+    key, values, horizon = task
+    if len(values) < MIN_SERIES_WEEKS:
+        return key, None
+    return key, HoltWinters.fit(values).forecast(horizon)
+
+# Function to fit many series, in parallel when workers > 1
+def fit_many(tasks, workers=None):
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) < 2:
+        return [_fit_series(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Chunks amortize the pickling round trip over many small fits
+        return list(executor.map(_fit_series, tasks, chunksize=max(1, len(tasks) // (workers * 8))))
+
+# Function to get (order count, highest order id) per (seller, category); a change means new or removed orders
+def series_fingerprints(conn):
+    rows = conn.execute('''
+        SELECT o.seller_id, p.product_category, COUNT(*), MAX(o.order_id)
+        FROM orders o
+        JOIN products p ON o.product_id = p.product_id
+        WHERE o.seller_id IS NOT NULL AND p.product_category IS NOT NULL
+        GROUP BY o.seller_id, p.product_category
+    ''').fetchall()
+    return {(seller_id, category): (orders, last_order_id) for seller_id, category, orders, last_order_id in rows}
+
+# Function to get the last complete week with orders; every series is fitted up to that week, so
+# all forecasts start on the same week
+def last_complete_week(conn):
+    week = conn.execute('''
+        SELECT MAX(date(o.order_purchase_timestamp, 'weekday 0', '-6 days')) AS week
+        FROM orders o
+        JOIN products p ON o.product_id = p.product_id
+        WHERE o.seller_id IS NOT NULL AND p.product_category IS NOT NULL AND o.order_purchase_timestamp IS NOT NULL
+          AND date(o.order_purchase_timestamp, 'weekday 0', '-6 days') < ?
+    ''', (_this_week().date().isoformat(),)).fetchone()[0]
+    return None if week is None else pd.Timestamp(week)
+
+# Function to build one fitting task per series in keys: weekly sales up to the week end
+def series_tasks(conn, keys, end, horizon=SERIES_FORECAST_WEEKS):
+    rows = conn.execute('''
+        SELECT o.seller_id, p.product_category, date(o.order_purchase_timestamp, 'weekday 0', '-6 days') AS week,
+               SUM(COALESCE(p.price, 0))
+        FROM orders o
+        JOIN products p ON o.product_id = p.product_id
+        WHERE o.seller_id IS NOT NULL AND p.product_category IS NOT NULL AND o.order_purchase_timestamp IS NOT NULL
+        GROUP BY o.seller_id, p.product_category, week
+    ''').fetchall()
+    sales = pd.DataFrame(rows, columns=['seller_id', 'product_category', 'week', 'price'])
+    sales['week'] = pd.to_datetime(sales['week'])
+    sales = sales[sales['week'] <= end]
+    keys = set(keys)
+    tasks = []
+    for key, group in sales.groupby(['seller_id', 'product_category'], sort=False):
+        if key not in keys:
+            continue
+        weeks = pd.date_range(group['week'].min(), end, freq='W-MON')
+        values = group.set_index('week')['price'].reindex(weeks, fill_value=0.0).to_numpy()
+        tasks.append((key, values, horizon))
+    return tasks
+
+# Function to refit the series whose orders changed (or all of them) and store their forecasts.
+# A series is also refitted when the last complete week moves on, even without new orders of its
+# own, so no stored forecast starts earlier than the others.
+def run_batch_forecasts(workers=None, full=False, horizon=SERIES_FORECAST_WEEKS):
+    with connect() as conn:
+        end = last_complete_week(conn)
+        last_week = None if end is None else end.date().isoformat()
+        fingerprints = {key: (*fingerprint, last_week) for key, fingerprint in series_fingerprints(conn).items()}
+        fitted = {(seller_id, category): tuple(fingerprint) for seller_id, category, *fingerprint in conn.execute(
+            'SELECT seller_id, product_category, orders, last_order_id, last_week FROM forecast_series')}
+        changed = [key for key, fingerprint in fingerprints.items() if full or fitted.get(key) != fingerprint]
+        removed = [key for key in fitted if key not in fingerprints]
+        tasks = [] if end is None else series_tasks(conn, changed, end, horizon)
+
+    results = fit_many(tasks, workers)
+
+    fitted_at = datetime.now()
+    weeks = [] if end is None else [week.date() for week in pd.date_range(end + pd.Timedelta(weeks=1), periods=horizon, freq='W-MON')]
+    with connect() as conn:
+        conn.executemany('DELETE FROM forecasts WHERE seller_id = ? AND product_category = ?', changed + removed)
+        conn.executemany('DELETE FROM forecast_series WHERE seller_id = ? AND product_category = ?', removed)
+        conn.executemany('INSERT INTO forecasts (seller_id, product_category, week, predicted) VALUES (?, ?, ?, ?)',
+                         [(seller_id, category, week, float(value))
+                          for (seller_id, category), predicted in results if predicted is not None
+                          for week, value in zip(weeks, predicted)])
+        conn.executemany('''
+            INSERT OR REPLACE INTO forecast_series (seller_id, product_category, orders, last_order_id, last_week, fitted_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(*key, *fingerprints[key], fitted_at) for key in changed])
+    return len(changed), sum(predicted is not None for _, predicted in results)
+
+# Function to time fit_many on synthetic series for 1, 2, 4, ... worker processes
+def benchmark_batch(series=2000, weeks=156):
+    rng = np.random.default_rng(0)
+    t = np.arange(weeks)
+    tasks = [(i, 50 + 20 * np.sin(2 * np.pi * t / SEASON_LENGTH) + 0.2 * t + rng.normal(0, 5, weeks), SERIES_FORECAST_WEEKS)
+             for i in range(series)]
+    counts = sorted({1, os.cpu_count() or 1} | {2 ** i for i in range(1, 8) if 2 ** i < (os.cpu_count() or 1)})
+    for workers in counts:
+        start = time.perf_counter()
+        fit_many(tasks, workers)
+        elapsed = time.perf_counter() - start
+        print(f'{workers:>3} worker(s): {series / elapsed:,.0f} series/s ({elapsed:.2f}s for {series} series)')
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Backtest: fit on all but the last weeks, score the forecast against what actually happened
+
+
+def backtest(history, holdout=8, folds=4):
+    results = []
+    for fold in range(folds, 0, -1):
+        cut = len(history) - fold * holdout
+        if cut < 3:
+            continue
+        train, test = history.iloc[:cut], history.iloc[cut:cut + holdout]
+        forecast = build_forecast(train, horizon=len(test))
+        predicted = forecast.predicted.to_numpy()
+        # Seasonal naive (same week last year, else last week) as the bar to beat
+        naive = train.iloc[-SEASON_LENGTH:].to_numpy()[:len(test)] if len(train) >= SEASON_LENGTH else np.full(len(test), train.iloc[-1])
+        actual = test.to_numpy()
+        results.append({
+            'train_weeks': cut,
+            'fit_seconds': forecast.fit_seconds,
+            'mae': np.abs(actual - predicted).mean(),
+            'naive_mae': np.abs(actual - naive).mean(),
+            'mape': _mape(actual, predicted),
+        })
+    return pd.DataFrame(results)
+
+def _mape(actual, predicted):
+    nonzero = actual != 0
+    if not nonzero.any():
+        return float('nan')
+    return float(np.abs((actual[nonzero] - predicted[nonzero]) / actual[nonzero]).mean() * 100)
+
+
+if __name__ == '__main__':
+    # python -m pages.forecasting                      fit the orders table and print the forecast
+    # python -m pages.forecasting --backtest [--csv]   score held-out weeks (orders table, or the
+    #                                                  Data/New analytics orders with --csv)
+    # python -m pages.forecasting --batch [--full]     refit changed (or all) seller/category series
+    # python -m pages.forecasting --batch --bench      series per second for 1, 2, 4, ... processes
+    if '--batch' in sys.argv:
+        if '--bench' in sys.argv:
+            benchmark_batch()
+        else:
+            start = time.perf_counter()
+            changed, stored = run_batch_forecasts(full='--full' in sys.argv)
+            print(f'Refitted {changed} series, stored {stored} forecasts in {time.perf_counter() - start:.2f}s')
+        sys.exit(0)
+
+    if '--csv' in sys.argv:
+        from pages.analytics import shared_table
+        weekly = sales_rollups(shared_table('orders_all', ['order_purchase_timestamp', 'price']))['Weekly']
+        history = _complete_weeks(weekly.set_index('Weekly Date')['price'])
+    else:
+        history = weekly_sales()
+    if len(history) < 3:
+        sys.exit(f'Only {len(history)} week(s) of sales; nothing to forecast')
+
+    if '--backtest' in sys.argv:
+        print(f'{len(history)} weeks of history')
+        print(backtest(history).to_string(index=False, float_format=lambda v: f'{v:,.3f}'))
+    else:
+        forecast = build_forecast(history)
+        print(f'Fitted {len(history)} weeks in {forecast.fit_seconds:.3f}s '
+              f'(alpha={forecast.model.alpha:.2f} beta={forecast.model.beta:.2f} '
+              f'gamma={forecast.model.gamma:.2f} phi={forecast.model.phi:.2f})')
+        print(forecast.predicted.round(2).to_string())
@@ -0,0 +1,145 @@
+import io
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Product image store.
+#
+# Uploaded images are written once to a content-addressed directory (file name = sha256 of the
+# bytes) together with a fixed-size thumbnail. products.image1/image2/image3 only hold the hash,
+# so listing queries stay small; grids render the thumbnail and the original is read on demand.
+# Images stored inline by older versions are moved here by migration 9 (pages/migrations.py).
+
+IMAGE_DIR = os.environ.get('SUPERSALES_IMAGE_DIR', 'images')
+THUMBNAIL_DIR = os.path.join(IMAGE_DIR, 'thumbs')
+THUMBNAIL_SIZE = (320, 320)
+IMAGE_SLOTS = ('image1', 'image2', 'image3')
+
+
+def original_path(ref):
+    return os.path.join(IMAGE_DIR, ref)
+
+def thumbnail_path(ref):
+    return os.path.join(THUMBNAIL_DIR, f'{ref}.jpg')
+
+# Function to build the thumbnail bytes for an uploaded image
+def make_thumbnail(data):
+    img = Image.open(io.BytesIO(data))
+    img.thumbnail(THUMBNAIL_SIZE)
+    if img.mode != 'RGB':
+        # Flatten transparency onto white so the thumbnail can be stored as JPEG
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        rgba = img.convert('RGBA')
+        background.paste(rgba, mask=rgba.split()[-1])
+        img = background
+    out = io.BytesIO()
+    img.save(out, format='JPEG', quality=85, optimize=True)
+    return out.getvalue()
+
+def _write_atomic(path, data):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+# Function to store an uploaded image and its thumbnail, returning the reference kept in products
+def save_image(data):
+    ref = hashlib.sha256(data).hexdigest()
+    os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+    if not os.path.exists(original_path(ref)):
+        _write_atomic(original_path(ref), data)
+    if not os.path.exists(thumbnail_path(ref)):
+        _write_atomic(thumbnail_path(ref), make_thumbnail(data))
+    return ref
+
+# Function to get something st.image can display for a stored image reference
+def image_source(ref, original=False):
+    if not ref:
+        return None
+    path = original_path(ref) if original else thumbnail_path(ref)
+    if not original and not os.path.exists(path) and os.path.exists(original_path(ref)):
+        with open(original_path(ref), 'rb') as f:
+            _write_atomic(path, make_thumbnail(f.read()))
+    return path
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Process-wide LRU cache of encoded thumbnails, shared by every session's reruns
+
+THUMBNAIL_CACHE_BYTES = int(os.environ.get('SUPERSALES_THUMBNAIL_CACHE_MB', 64)) * 1024 * 1024
+
+
+class ThumbnailCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (product_id, slot) -> (ref, data)
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, product_id, slot, ref):
+        key = (product_id, slot)
+        with self._lock:
+            entry = self._entries.get(key)
+            # A different ref means the image in this slot was replaced
+            if entry is not None and entry[0] == ref:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        data = _load_thumbnail(ref)
+        if data is not None:
+            self._put(key, ref, data)
+        return data
+
+    def _put(self, key, ref, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self._entries[key] = (ref, data)
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def invalidate_product(self, product_id):
+        with self._lock:
+            for slot in IMAGE_SLOTS:
+                entry = self._entries.pop((product_id, slot), None)
+                if entry is not None:
+                    self.size -= len(entry[1])
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.size, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+def _load_thumbnail(ref):
+    if not ref:
+        return None
+    path = image_source(ref)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+thumbnail_cache = ThumbnailCache(THUMBNAIL_CACHE_BYTES)
+
+# Function to get the cached thumbnail bytes for one image slot of a product
+def product_thumbnail(product_id, slot, ref):
+    return thumbnail_cache.get(product_id, slot, ref)
+
+# Function to drop a product's thumbnails after it is deleted or its images are replaced
+def invalidate_product_images(product_id):
+    thumbnail_cache.invalidate_product(product_id)
@@ -0,0 +1,580 @@
+import sys
+import sqlite3
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Versioned schema migrations for users.db.
+#
+# PRAGMA user_version records the last migration applied. pages/db.py runs migrate() once per
+# process when it is first imported, so every page sees an up-to-date schema. New changes are
+# appended to MIGRATIONS as (version, description, [statements]); never edit an applied one.
+# A statement is SQL or a function taking the connection, for data moves SQL cannot express.
+# 'VACUUM' cannot run inside the migration transaction, so it runs once after the commit.
+
+# Keep seller_order_summary in step with every write to orders (checkout, status updates, imports).
+# Status flags use IS, so an order with a NULL status counts as 0 instead of making the sums NULL.
+ORDERS_SUMMARY_TRIGGERS = {
+    'orders_summary_ai': '''
+    CREATE TRIGGER IF NOT EXISTS orders_summary_ai AFTER INSERT ON orders
+    WHEN NEW.seller_id IS NOT NULL
+    BEGIN
+        INSERT OR IGNORE INTO seller_order_summary (seller_id) VALUES (NEW.seller_id);
+        UPDATE seller_order_summary
+        SET total_sales = total_sales + COALESCE((SELECT price FROM products WHERE product_id = NEW.product_id), 0),
+            delivered = delivered + (NEW.order_status IS 'Delivered'),
+            shipped = shipped + (NEW.order_status IS 'Shipped'),
+            cancelled = cancelled + (NEW.order_status IS 'Cancelled')
+        WHERE seller_id = NEW.seller_id;
+    END
+    ''',
+    'orders_summary_ad': '''
+    CREATE TRIGGER IF NOT EXISTS orders_summary_ad AFTER DELETE ON orders
+    WHEN OLD.seller_id IS NOT NULL
+    BEGIN
+        UPDATE seller_order_summary
+        SET total_sales = total_sales - COALESCE((SELECT price FROM products WHERE product_id = OLD.product_id), 0),
+            delivered = delivered - (OLD.order_status IS 'Delivered'),
+            shipped = shipped - (OLD.order_status IS 'Shipped'),
+            cancelled = cancelled - (OLD.order_status IS 'Cancelled')
+        WHERE seller_id = OLD.seller_id;
+    END
+    ''',
+    'orders_summary_au': '''
+    CREATE TRIGGER IF NOT EXISTS orders_summary_au AFTER UPDATE OF seller_id, product_id, order_status ON orders
+    BEGIN
+        UPDATE seller_order_summary
+        SET total_sales = total_sales - COALESCE((SELECT price FROM products WHERE product_id = OLD.product_id), 0),
+            delivered = delivered - (OLD.order_status IS 'Delivered'),
+            shipped = shipped - (OLD.order_status IS 'Shipped'),
+            cancelled = cancelled - (OLD.order_status IS 'Cancelled')
+        WHERE seller_id = OLD.seller_id;
+        INSERT OR IGNORE INTO seller_order_summary (seller_id) SELECT NEW.seller_id WHERE NEW.seller_id IS NOT NULL;
+        UPDATE seller_order_summary
+        SET total_sales = total_sales + COALESCE((SELECT price FROM products WHERE product_id = NEW.product_id), 0),
+            delivered = delivered + (NEW.order_status IS 'Delivered'),
+            shipped = shipped + (NEW.order_status IS 'Shipped'),
+            cancelled = cancelled + (NEW.order_status IS 'Cancelled')
+        WHERE seller_id = NEW.seller_id;
+    END
+    ''',
+}
+
+# total_sales sums the current price of each order's product, like the dashboard's original
+# re-join: a price change or a deleted product adjusts every seller with orders for it.
+PRODUCTS_SUMMARY_TRIGGERS = {
+    'products_summary_ai': '''
+    CREATE TRIGGER IF NOT EXISTS products_summary_ai AFTER INSERT ON products
+    BEGIN
+        UPDATE seller_order_summary
+        SET total_sales = total_sales + NEW.price * (
+            SELECT COUNT(*) FROM orders o WHERE o.product_id = NEW.product_id AND o.seller_id = seller_order_summary.seller_id)
+        WHERE NEW.price IS NOT NULL AND seller_id IN (SELECT seller_id FROM orders WHERE product_id = NEW.product_id);
+    END
+    ''',
+    'products_summary_ad': '''
+    CREATE TRIGGER IF NOT EXISTS products_summary_ad AFTER DELETE ON products
+    BEGIN
+        UPDATE seller_order_summary
+        SET total_sales = total_sales - OLD.price * (
+            SELECT COUNT(*) FROM orders o WHERE o.product_id = OLD.product_id AND o.seller_id = seller_order_summary.seller_id)
+        WHERE OLD.price IS NOT NULL AND seller_id IN (SELECT seller_id FROM orders WHERE product_id = OLD.product_id);
+    END
+    ''',
+    'products_summary_au': '''
+    CREATE TRIGGER IF NOT EXISTS products_summary_au AFTER UPDATE OF product_id, price ON products
+    WHEN OLD.product_id IS NOT NEW.product_id OR OLD.price IS NOT NEW.price
+    BEGIN
+        UPDATE seller_order_summary
+        SET total_sales = total_sales - OLD.price * (
+            SELECT COUNT(*) FROM orders o WHERE o.product_id = OLD.product_id AND o.seller_id = seller_order_summary.seller_id)
+        WHERE OLD.price IS NOT NULL AND seller_id IN (SELECT seller_id FROM orders WHERE product_id = OLD.product_id);
+        UPDATE seller_order_summary
+        SET total_sales = total_sales + NEW.price * (
+            SELECT COUNT(*) FROM orders o WHERE o.product_id = NEW.product_id AND o.seller_id = seller_order_summary.seller_id)
+        WHERE NEW.price IS NOT NULL AND seller_id IN (SELECT seller_id FROM orders WHERE product_id = NEW.product_id);
+    END
+    ''',
+}
+
+# Function to move image BLOBs still stored inline in products out to the image store
+# (pages/images.py), leaving only their references in image1/image2/image3
+def _move_product_images(conn):
+    product_ids = [product_id for (product_id,) in conn.execute('''
+        SELECT product_id FROM products
+        WHERE typeof(image1) = 'blob' OR typeof(image2) = 'blob' OR typeof(image3) = 'blob'
+    ''')]
+    if not product_ids:
+        return
+    from pages.images import save_image
+    # One product at a time, so only one product's images are in memory
+    for product_id in product_ids:
+        images = conn.execute('SELECT image1, image2, image3 FROM products WHERE product_id = ?', (product_id,)).fetchone()
+        refs = [save_image(bytes(image)) if isinstance(image, bytes) else image for image in images]
+        conn.execute('UPDATE products SET image1 = ?, image2 = ?, image3 = ? WHERE product_id = ?', (*refs, product_id))
+
+MIGRATIONS = [
+    (1, 'create base schema', [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT UNIQUE,
+            email TEXT UNIQUE,
+            password TEXT,
+            state INTEGER DEFAULT 0,
+            designation TEXT,
+            residing_state TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS products (
+            product_id INTEGER PRIMARY KEY,
+            seller_id INTEGER,
+            product_category TEXT,
+            product_name TEXT,
+            product_brand TEXT,
+            product_weight_g FLOAT,
+            product_length_cm FLOAT,
+            product_width_cm FLOAT,
+            product_height_cm FLOAT,
+            price FLOAT,
+            quantity INT,
+            image1 BLOB,
+            image2 BLOB,
+            image3 BLOB,
+            FOREIGN KEY (seller_id) REFERENCES users (id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS orders (
+            order_id INTEGER PRIMARY KEY,
+            customer_id INTEGER,
+            seller_id INTEGER,
+            product_id INTEGER,
+            quantity INT,
+            order_status TEXT,
+            address TEXT,
+            phone TEXT,
+            total_charge FLOAT,
+            payment_method TEXT,
+            order_purchase_timestamp DATETIME,
+            FOREIGN KEY (product_id) REFERENCES products (product_id),
+            FOREIGN KEY (customer_id) REFERENCES users (id),
+            FOREIGN KEY (seller_id) REFERENCES users (id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS review (
+            review_id INTEGER PRIMARY KEY,
+            order_id INTEGER,
+            order_status TEXT,
+            review_score FLOAT,
+            review_comment_message TEXT,
+            sentiment_result TEXT,
+            review_timestamp DATETIME,
+            FOREIGN KEY (order_id) REFERENCES orders (order_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS shopping_cart (
+            cart_id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            product_id INTEGER,
+            quantity INT,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (product_id) REFERENCES products (product_id)
+        )
+        ''',
+    ]),
+    (2, 'indexes for the hot query predicates', [
+        'CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)',
+        'CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)',
+        'CREATE INDEX IF NOT EXISTS idx_users_state ON users (state)',
+        'CREATE INDEX IF NOT EXISTS idx_users_designation ON users (designation)',
+        'CREATE INDEX IF NOT EXISTS idx_products_seller ON products (seller_id)',
+        'CREATE INDEX IF NOT EXISTS idx_products_category ON products (product_category, product_id)',
+        'CREATE INDEX IF NOT EXISTS idx_orders_seller_status_ts ON orders (seller_id, order_status, order_purchase_timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_orders_customer_ts ON orders (customer_id, order_purchase_timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_cart_user_product ON shopping_cart (user_id, product_id)',
+        'CREATE INDEX IF NOT EXISTS idx_review_order ON review (order_id)',
+        'ANALYZE',
+    ]),
+    (3, 'per-seller order summary maintained by triggers', [
+        '''
+        CREATE TABLE IF NOT EXISTS seller_order_summary (
+            seller_id INTEGER PRIMARY KEY,
+            total_sales FLOAT NOT NULL DEFAULT 0,
+            total_customers INT NOT NULL DEFAULT 0,
+            delivered INT NOT NULL DEFAULT 0,
+            shipped INT NOT NULL DEFAULT 0,
+            cancelled INT NOT NULL DEFAULT 0
+        )
+        ''',
+        # Orders per (seller, customer) so the distinct customer count can be kept incrementally
+        '''
+        CREATE TABLE IF NOT EXISTS seller_customers (
+            seller_id INTEGER NOT NULL,
+            customer_id INTEGER NOT NULL,
+            orders INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (seller_id, customer_id)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS seller_customers_ai AFTER INSERT ON seller_customers
+        BEGIN
+            INSERT OR IGNORE INTO seller_order_summary (seller_id) VALUES (NEW.seller_id);
+            UPDATE seller_order_summary SET total_customers = total_customers + 1 WHERE seller_id = NEW.seller_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS seller_customers_ad AFTER DELETE ON seller_customers
+        BEGIN
+            UPDATE seller_order_summary SET total_customers = total_customers - 1 WHERE seller_id = OLD.seller_id;
+        END
+        ''',
+        # Backfill from the orders already in the database
+        '''
+        INSERT OR REPLACE INTO seller_order_summary (seller_id, total_sales, total_customers, delivered, shipped, cancelled)
+        SELECT o.seller_id, COALESCE(SUM(p.price), 0), 0,
+               SUM(o.order_status IS 'Delivered'), SUM(o.order_status IS 'Shipped'), SUM(o.order_status IS 'Cancelled')
+        FROM orders o
+        LEFT JOIN products p ON o.product_id = p.product_id
+        WHERE o.seller_id IS NOT NULL
+        GROUP BY o.seller_id
+        ''',
+        '''
+        INSERT INTO seller_customers (seller_id, customer_id, orders)
+        SELECT seller_id, customer_id, COUNT(*)
+        FROM orders
+        WHERE seller_id IS NOT NULL AND customer_id IS NOT NULL
+        GROUP BY seller_id, customer_id
+        ''',
+        ORDERS_SUMMARY_TRIGGERS['orders_summary_ai'],
+        '''
+        CREATE TRIGGER IF NOT EXISTS orders_customers_ai AFTER INSERT ON orders
+        WHEN NEW.seller_id IS NOT NULL AND NEW.customer_id IS NOT NULL
+        BEGIN
+            INSERT INTO seller_customers (seller_id, customer_id, orders) VALUES (NEW.seller_id, NEW.customer_id, 1)
+            ON CONFLICT (seller_id, customer_id) DO UPDATE SET orders = orders + 1;
+        END
+        ''',
+        ORDERS_SUMMARY_TRIGGERS['orders_summary_ad'],
+        '''
+        CREATE TRIGGER IF NOT EXISTS orders_customers_ad AFTER DELETE ON orders
+        WHEN OLD.seller_id IS NOT NULL AND OLD.customer_id IS NOT NULL
+        BEGIN
+            UPDATE seller_customers SET orders = orders - 1
+            WHERE seller_id = OLD.seller_id AND customer_id = OLD.customer_id;
+            DELETE FROM seller_customers
+            WHERE seller_id = OLD.seller_id AND customer_id = OLD.customer_id AND orders <= 0;
+        END
+        ''',
+        # An update is handled as removing the old row and adding the new one
+        ORDERS_SUMMARY_TRIGGERS['orders_summary_au'],
+        '''
+        CREATE TRIGGER IF NOT EXISTS orders_customers_au AFTER UPDATE OF seller_id, customer_id ON orders
+        BEGIN
+            UPDATE seller_customers SET orders = orders - 1
+            WHERE seller_id = OLD.seller_id AND customer_id = OLD.customer_id;
+            DELETE FROM seller_customers
+            WHERE seller_id = OLD.seller_id AND customer_id = OLD.customer_id AND orders <= 0;
+            INSERT INTO seller_customers (seller_id, customer_id, orders)
+            SELECT NEW.seller_id, NEW.customer_id, 1
+            WHERE NEW.seller_id IS NOT NULL AND NEW.customer_id IS NOT NULL
+            ON CONFLICT (seller_id, customer_id) DO UPDATE SET orders = orders + 1;
+        END
+        ''',
+    ]),
+    (4, 'per seller and category sales forecasts', [
+        # Written by the batch job in pages/forecasting.py (python -m pages.forecasting --batch)
+        '''
+        CREATE TABLE IF NOT EXISTS forecasts (
+            seller_id INTEGER NOT NULL,
+            product_category TEXT NOT NULL,
+            week DATE NOT NULL,
+            predicted FLOAT NOT NULL,
+            PRIMARY KEY (seller_id, product_category, week)
+        ) WITHOUT ROWID
+        ''',
+        # What each series looked like when it was last fitted, so only changed series are refitted
+        '''
+        CREATE TABLE IF NOT EXISTS forecast_series (
+            seller_id INTEGER NOT NULL,
+            product_category TEXT NOT NULL,
+            orders INT NOT NULL,
+            last_order_id INT NOT NULL,
+            fitted_at DATETIME NOT NULL,
+            PRIMARY KEY (seller_id, product_category)
+        ) WITHOUT ROWID
+        ''',
+    ]),
+    (5, 'queue of reviews waiting for sentiment scoring', [
+        # Only the handful of unscored reviews are in this index, see pages/sentiment.py
+        "CREATE INDEX IF NOT EXISTS idx_review_pending ON review (review_id) WHERE sentiment_result = 'pending'",
+    ]),
+    (6, 'sentiment results by text hash and backfill checkpoints', [
+        '''
+        CREATE TABLE IF NOT EXISTS sentiment_cache (
+            text_hash TEXT NOT NULL,
+            model TEXT NOT NULL,
+            label TEXT NOT NULL,
+            PRIMARY KEY (text_hash, model)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+            name TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            updated_at DATETIME
+        )
+        ''',
+    ]),
+    (7, 'seller summary triggers count orders with a NULL status as 0', [
+        *[f'DROP TRIGGER IF EXISTS {name}' for name in ORDERS_SUMMARY_TRIGGERS],
+        *ORDERS_SUMMARY_TRIGGERS.values(),
+    ]),
+    (8, 'last week each series forecast was fitted up to', [
+        # Rows fitted before this column existed have NULL and are refitted on the next batch run
+        'ALTER TABLE forecast_series ADD COLUMN last_week DATE',
+    ]),
+    (9, 'product images moved out of the database into the image store', [
+        _move_product_images,
+        # Give the space used by the old BLOBs back to the filesystem
+        'VACUUM',
+    ]),
+    (10, 'seller total_sales follows product price changes and deletions', [
+        'CREATE INDEX IF NOT EXISTS idx_orders_product_seller ON orders (product_id, seller_id)',
+        *PRODUCTS_SUMMARY_TRIGGERS.values(),
+        # Totals kept since migration 3 still count the prices of deleted or repriced products
+        '''
+        UPDATE seller_order_summary
+        SET total_sales = COALESCE((
+            SELECT SUM(p.price) FROM orders o JOIN products p ON o.product_id = p.product_id
+            WHERE o.seller_id = seller_order_summary.seller_id), 0)
+        ''',
+    ]),
+    (11, 'drop user indexes that duplicate the UNIQUE constraints on username and email', [
+        'DROP INDEX IF EXISTS idx_users_email',
+        'DROP INDEX IF EXISTS idx_users_username',
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Function to apply every migration newer than the database's user_version
+def migrate(conn):
+    if conn.execute('PRAGMA user_version').fetchone()[0] >= LATEST_VERSION:
+        return []
+
+    applied = []
+    vacuum = False
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Re-read under the write lock in case another process migrated first
+        current = conn.execute('PRAGMA user_version').fetchone()[0]
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                elif statement == 'VACUUM':
+                    vacuum = True
+                else:
+                    conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {version}')
+            applied.append((version, description))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if vacuum:
+        conn.execute('VACUUM')
+    return applied
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Query plan regression check: the hot queries must be answered through an index
+
+HOT_QUERIES = [
+    ('login', 'SELECT * FROM users WHERE email = ? AND password = ?', ('a@b.c', 'x')),
+    ('logged-in user', 'SELECT * FROM users WHERE state = 1', ()),
+    ('user designation', 'SELECT designation FROM users WHERE username = ?', ('a',)),
+    ('sellers list', 'SELECT id, username, email, residing_state FROM users WHERE username != "Admin" and designation="Seller"', ()),
+    ('cart count', 'SELECT SUM(quantity) FROM shopping_cart WHERE user_id = ?', (1,)),
+    ('cart membership', 'SELECT * FROM shopping_cart WHERE user_id = ? AND product_id = ?', (1, 1)),
+    ('cart items', '''
+        SELECT p.product_id, p.price, c.quantity
+        FROM shopping_cart c
+        JOIN products p ON c.product_id = p.product_id
+        WHERE c.user_id = ?
+    ''', (1,)),
+    ('catalog page', '''
+        SELECT product_id, product_name FROM products
+        WHERE product_category = ? AND product_id > ?
+        ORDER BY product_id LIMIT ?
+    ''', ('a', 0, 25)),
+    ('seller products', 'SELECT product_id FROM products WHERE seller_id = ?', (1,)),
+    ('seller orders', '''
+        SELECT c.order_id, p.product_name
+        FROM orders c
+        JOIN products p ON c.product_id = p.product_id
+        WHERE c.seller_id = ? AND c.order_status != 'Cancelled'
+        ORDER BY order_purchase_timestamp DESC
+    ''', (1,)),
+    ('seller delivered orders', '''
+        SELECT c.order_id, r.review_score
+        FROM orders c
+        JOIN products p ON c.product_id = p.product_id
+        LEFT JOIN review r ON c.order_id = r.order_id
+        WHERE c.seller_id = ? AND c.order_status = 'Delivered'
+        ORDER BY c.order_purchase_timestamp DESC
+    ''', (1,)),
+    ('seller status count', "SELECT COUNT(*) FROM orders WHERE seller_id = ? AND order_status = 'Shipped'", (1,)),
+    ('customer orders', '''
+        SELECT c.order_id, p.product_name
+        FROM orders c
+        JOIN products p ON c.product_id = p.product_id
+        WHERE c.customer_id = ?
+        ORDER BY order_purchase_timestamp DESC
+    ''', (1,)),
+    ('customer order count', 'SELECT COUNT(*) FROM orders WHERE customer_id = ?', (1,)),
+    ('order review', 'SELECT * FROM review WHERE order_id = ?', (1,)),
+    ('seller review counts', '''
+        SELECT SUM(r.review_score >= 3), SUM(r.review_score > 0 AND r.review_score < 3)
+        FROM orders c
+        JOIN review r ON c.order_id = r.order_id
+        WHERE c.seller_id = ? AND c.order_status = 'Delivered'
+    ''', (1,)),
+    ('seller category counts', '''
+        SELECT p.product_category, COUNT(*)
+        FROM orders c
+        JOIN products p ON c.product_id = p.product_id
+        WHERE c.seller_id = ? AND c.order_status = 'Delivered'
+        GROUP BY p.product_category
+    ''', (1,)),
+    ('orders per product', 'SELECT seller_id, COUNT(*) FROM orders WHERE product_id = ? GROUP BY seller_id', (1,)),
+    ('seller KPIs', 'SELECT total_sales, total_customers, delivered, shipped, cancelled FROM seller_order_summary WHERE seller_id = ?', (1,)),
+    ('pending reviews', "SELECT review_id, review_comment_message FROM review WHERE sentiment_result = 'pending' ORDER BY review_id LIMIT ?", (32,)),
+    ('review queue depth', "SELECT COUNT(*) FROM review WHERE sentiment_result = 'pending'", ()),
+    ('sentiment cache', 'SELECT text_hash, label FROM sentiment_cache WHERE model = ? AND text_hash IN (?, ?)', ('m', 'a', 'b')),
+    ('reviews to backfill', 'SELECT review_id, review_comment_message FROM review WHERE review_id > ? ORDER BY review_id LIMIT ?', (0, 1000)),
+    ('seller forecasts', 'SELECT product_category, week, predicted FROM forecasts WHERE seller_id = ? ORDER BY product_category, week', (1,)),
+]
+
+# Function to list hot queries whose plan contains a full table scan
+def find_full_scans(conn):
+    problems = []
+    for name, sql, params in HOT_QUERIES:
+        for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall():
+            detail = row[-1]
+            if detail.startswith('SCAN ') and 'USING' not in detail:
+                problems.append((name, detail))
+    return problems
+
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Seller KPI benchmark: the five queries fetch_order_counts used to run against the summary lookup
+
+SELLER_KPI_QUERIES = [
+    'SELECT SUM(p.price) FROM orders c JOIN products p ON c.product_id = p.product_id WHERE c.seller_id = ?',
+    'SELECT COUNT(DISTINCT c.customer_id) FROM orders c WHERE c.seller_id = ?',
+    "SELECT COUNT(*) FROM orders c WHERE c.seller_id = ? AND c.order_status = 'Delivered'",
+    "SELECT COUNT(*) FROM orders c WHERE c.seller_id = ? AND c.order_status = 'Shipped'",
+    "SELECT COUNT(*) FROM orders c WHERE c.seller_id = ? AND c.order_status = 'Cancelled'",
+]
+
+# Function to load synthetic orders into a scratch database and time the seller dashboard KPIs
+# both ways; returns the sellers whose summary row disagrees with the direct queries
+def benchmark_seller_summary(path, orders=1_000_000, sellers=1000, samples=200):
+    import time
+    import numpy as np
+    rng = np.random.default_rng(0)
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    customers = sellers * 5
+    conn.executemany("INSERT INTO users (id, username, designation) VALUES (?, ?, 'Seller')",
+                     [(i, f'seller{i}') for i in range(1, sellers + 1)])
+    conn.executemany("INSERT INTO users (id, username, designation) VALUES (?, ?, 'Customer')",
+                     [(i, f'customer{i}') for i in range(sellers + 1, sellers + customers + 1)])
+    conn.executemany('INSERT INTO products (product_id, seller_id, price) VALUES (?, ?, ?)',
+                     [(seller * 10 + k, seller, float(rng.integers(5, 500))) for seller in range(1, sellers + 1) for k in range(10)])
+    conn.commit()
+
+    # Every insert goes through the summary triggers; NULL statuses are included on purpose
+    statuses = np.array(['Processing', 'Shipped', 'Delivered', 'Cancelled', None], dtype=object)
+    start = time.perf_counter()
+    for offset in range(0, orders, 100_000):
+        n = min(100_000, orders - offset)
+        seller = rng.integers(1, sellers + 1, n)
+        conn.executemany('''
+            INSERT INTO orders (customer_id, seller_id, product_id, order_status, order_purchase_timestamp)
+            VALUES (?, ?, ?, ?, datetime('now'))
+        ''', zip(rng.integers(sellers + 1, sellers + customers + 1, n).tolist(), seller.tolist(),
+                 (seller * 10 + rng.integers(0, 10, n)).tolist(), statuses[rng.integers(0, len(statuses), n)].tolist()))
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    print(f'{orders:,} orders for {sellers:,} sellers inserted at {orders / elapsed:,.0f} orders/s (triggers included)')
+
+    # Status updates (including to and from NULL) go through orders_summary_au
+    conn.execute('''
+        UPDATE orders SET order_status = CASE order_id % 3 WHEN 0 THEN NULL WHEN 1 THEN 'Delivered' ELSE 'Shipped' END
+        WHERE order_id % 97 = 0
+    ''')
+    conn.commit()
+    # Repriced, unpriced and deleted products go through the products triggers
+    start = time.perf_counter()
+    conn.execute('UPDATE products SET price = price * 1.1 WHERE product_id % 7 = 0')
+    conn.execute('UPDATE products SET price = NULL WHERE product_id % 53 = 0')
+    conn.execute('DELETE FROM products WHERE product_id % 11 = 0')
+    conn.commit()
+    print(f'product price changes and deletions applied in {time.perf_counter() - start:.2f}s (triggers included)')
+    conn.execute('ANALYZE')
+
+    sample = rng.choice(np.arange(1, sellers + 1), min(samples, sellers), replace=False).tolist()
+    before, after, mismatched = [], [], []
+    for seller_id in sample:
+        start = time.perf_counter()
+        direct = [conn.execute(sql, (seller_id,)).fetchone()[0] or 0 for sql in SELLER_KPI_QUERIES]
+        before.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        summary = conn.execute('''
+            SELECT total_sales, total_customers, delivered, shipped, cancelled FROM seller_order_summary WHERE seller_id = ?
+        ''', (seller_id,)).fetchone()
+        after.append(time.perf_counter() - start)
+        if summary is None or not np.allclose(direct, summary):
+            mismatched.append((seller_id, direct, summary))
+    for label, times in [('five queries', before), ('summary lookup', after)]:
+        print(f'{label}: p50 {np.percentile(times, 50) * 1000:.3f} ms, p99 {np.percentile(times, 99) * 1000:.3f} ms per dashboard')
+    conn.close()
+    return mismatched
+
+if __name__ == '__main__':
+    # python -m pages.migrations          migrate users.db and print its schema version
+    # python -m pages.migrations --check  verify hot query plans against a fresh schema
+    # python -m pages.migrations --bench [--orders N] [--sellers N]
+    #                                     seller KPI tiles on 1M synthetic orders across 1k sellers
+    if '--check' in sys.argv:
+        conn = sqlite3.connect(':memory:')
+        migrate(conn)
+        problems = find_full_scans(conn)
+        for name, detail in problems:
+            print(f'{name}: {detail}')
+        print('Query plans OK' if not problems else f'{len(problems)} hot query plan(s) fall back to a full scan')
+        sys.exit(1 if problems else 0)
+
+    if '--bench' in sys.argv:
+        import tempfile
+        def option(flag, default):
+            i = sys.argv.index(flag) + 1 if flag in sys.argv else len(sys.argv)
+            return int(sys.argv[i]) if i < len(sys.argv) else default
+        with tempfile.TemporaryDirectory() as directory:
+            mismatched = benchmark_seller_summary(f'{directory}/bench.db', option('--orders', 1_000_000),
+                                                  option('--sellers', 1000))
+        for seller_id, direct, summary in mismatched:
+            print(f'seller {seller_id}: summary {summary} != {direct}')
+        print(f'{len(mismatched)} seller(s) with a wrong summary' if mismatched else 'Summary matches the direct queries')
+        sys.exit(1 if mismatched else 0)
+
+    # Importing pages.db applies any pending migrations
+    from pages.db import connect
+    conn = connect()
+    print(f"Schema at version {conn.execute('PRAGMA user_version').fetchone()[0]}")
+    conn.close()
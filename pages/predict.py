@@ -1,10 +1,12 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-import os
 import plotly.express as px
-import hashlib
+from pages.db import fetch_logged_in_user
+from pages.analytics import shared_sales_rollups, downsample, MAX_CHART_POINTS
+from pages.forecasting import latest_forecast
 
 st.set_page_config(
     page_title="SuperSales - Predict Sales",
@@ -13,16 +15,6 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
-import sqlite3
-# Function to fetch logged-in user's information
-def fetch_logged_in_user():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE state = 1')
-    user = c.fetchone()
-    conn.close()
-    return user
-
 # Check if user is logged in
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     user = fetch_logged_in_user()
@@ -78,11 +70,6 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# Function to load data and cache it
-@st.cache_data  # Cache the returned dataframe
-def load_data(file_path):
-    return pd.read_csv(file_path)
-
 # Navbar HTML with logout button
 navbar_html = f"""
 <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.3/css/all.min.css" rel="stylesheet">
@@ -221,17 +208,6 @@ else:
     st.markdown(user_navbar_html, unsafe_allow_html=True)
 
 # /////////////////////////////////////////////////////////////////////////////////////////////
-# Function to load data and cache it
-@st.cache_data  # Cache the returned dataframe
-def load_data(file_path):
-    return pd.read_csv(file_path)
-
-# Get the directory of the current script
-current_dir = os.path.dirname('app.py')
-file_path = os.path.join(current_dir, r'Data\New\weekly_sales_predicted.csv')
-# Load the properties data
-df = load_data(file_path)
-
 # ////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
 st.markdown(
     """
@@ -284,24 +260,28 @@ def main():
     with st.container():
     # Sidebar with radio button for selecting time interval
         interval = st.radio("", ('Weekly', 'Monthly', 'Yearly'), horizontal=True)
-    # Load data
-    current_dir = os.path.dirname('app.py')
-    file_path = os.path.join(current_dir, 'Data/New/weekly_sales_predicted.csv')
-    df = pd.read_csv(file_path)
+        smooth = st.checkbox(f'Downsample to {MAX_CHART_POINTS} points', value=True)
+    # Live forecast from the background worker; the bundled CSV is shown until its first fit is ready
+    forecast = latest_forecast()
+    if forecast is not None:
+        rollups = forecast.rollups()
+        prediction_start = forecast.predicted.index[0]
+    else:
+        # Sales totals per period, computed once per version of the data
+        rollups = shared_sales_rollups('weekly_sales_predicted')
+        prediction_start = pd.to_datetime('2023-09-04')
 
     with st.container(border=True):
-        df['order_purchase_timestamp'] = pd.to_datetime(df['order_purchase_timestamp'])
-        
         # Process data based on selection
         if interval == 'Weekly':
-            df['Weekly Date'] = df['order_purchase_timestamp'].dt.to_period('W').apply(lambda r: r.start_time)
-            plot_data = df.groupby('Weekly Date')['price'].sum().reset_index()
+            plot_data = rollups['Weekly']
             plot_title = 'Weekly Sales'
             date_column = 'Weekly Date'
             
-            # Create a column to indicate "Actual" or "Predicted" from August 1st, 2023
-            august_1st_2023 = pd.to_datetime('2023-09-04')
-            plot_data['Status'] = plot_data[date_column].apply(lambda x: 'Predicted' if x >= august_1st_2023 else 'Actual')
+            # Create a column to indicate "Actual" or "Predicted" from the first forecast week
+            plot_data = plot_data.assign(Status=np.where(plot_data[date_column] >= prediction_start, 'Predicted', 'Actual'))
+            if smooth:
+                plot_data = downsample(plot_data, date_column, 'price')
 
             # Plotting with Plotly
             fig = px.line(plot_data, x=date_column, y='price',
@@ -311,14 +291,14 @@ def main():
                           color_discrete_map={'Actual': 'blue', 'Predicted': 'green'})
 
         elif interval == 'Monthly':
-            df['Month'] = df['order_purchase_timestamp'].dt.to_period('M').apply(lambda r: r.start_time)
-            plot_data = df.groupby('Month')['price'].sum().reset_index()
+            plot_data = rollups['Monthly']
             plot_title = 'Monthly Sales'
             date_column = 'Month'
             
-            # Create a column to indicate "Actual" or "Predicted" from August 1st, 2023
-            august_1st_2023 = pd.to_datetime('2023-09-04')
-            plot_data['Status'] = plot_data[date_column].apply(lambda x: 'Predicted' if x >= august_1st_2023 else 'Actual')
+            # Create a column to indicate "Actual" or "Predicted" from the first forecast week
+            plot_data = plot_data.assign(Status=np.where(plot_data[date_column] >= prediction_start, 'Predicted', 'Actual'))
+            if smooth:
+                plot_data = downsample(plot_data, date_column, 'price')
 
             # Plotting with Plotly
             fig = px.line(plot_data, x=date_column, y='price',
@@ -328,8 +308,7 @@ def main():
                           color_discrete_map={'Actual': 'blue', 'Predicted': 'green'})
 
         elif interval == 'Yearly':
-            df['Year'] = df['order_purchase_timestamp'].dt.year
-            plot_data = df.groupby('Year')['price'].sum().reset_index()
+            plot_data = rollups['Yearly']
             plot_title = 'Yearly Sales'
             date_column = 'Year'
 
@@ -364,6 +343,10 @@ def main():
 
         # Display the plot with a centered title
         st.plotly_chart(fig, use_container_width=True)
+        if forecast is not None:
+            st.caption(f'Forecast fitted {forecast.fitted_at:%Y-%m-%d %H:%M} on {len(forecast.history)} weeks of orders')
+        else:
+            st.caption('Showing the bundled forecast while the live forecast is being fitted')
 
 if __name__ == "__main__":
     main()
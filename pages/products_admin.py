@@ -3,7 +3,8 @@ import pandas as pd
 import os
 import plotly.express as px
 import sqlite3
-import hashlib
+from pages.db import connect, fetch_logged_in_user, update_user_state, fetch_user_designation
+from pages.images import save_image, product_thumbnail, invalidate_product_images
 
 # Initialize Streamlit
 st.set_page_config(
@@ -33,34 +34,16 @@ product_categories = df['product_category'].unique()
 product_categories.sort()
 
 # ////////////////////////////////////////////////////////////////////////////////////////////////
-# Function to hash passwords
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-# Function to fetch logged-in user's information
-def fetch_logged_in_user():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE state = 1')
-    user = c.fetchone()
-    conn.close()
-    return user
-
-# Function to update user state in the database
-def update_user_state(username, state):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('UPDATE users SET state = ? WHERE username = ?', (state, username))
-    conn.commit()
-    conn.close()
-
 # Function to create a product
 def create_product(seller_id, product_name, product_brand, product_category, 
                    product_weight_g, product_length_cm, product_width_cm, 
                    product_height_cm, product_price, product_images):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     try:
+        # Store the uploads in the image store and keep only their references on the row
+        image_refs = [save_image(data) for data in product_images[:3]]
+        image_refs += [None] * (3 - len(image_refs))
         c.execute('''
             INSERT INTO products (seller_id, product_name, product_brand, product_category,
                                   product_weight_g, product_length_cm, product_width_cm,
@@ -69,7 +52,7 @@ def create_product(seller_id, product_name, product_brand, product_category,
         ''', (seller_id, product_name, product_brand, product_category,
               product_weight_g, product_length_cm, product_width_cm,
               product_height_cm, product_price,
-              *product_images))
+              *image_refs))
         conn.commit()
         st.success('Product added successfully!')
     except sqlite3.IntegrityError:
@@ -98,7 +81,7 @@ def get_current_seller_id():
 seller_id = get_current_seller_id()
 
 def get_products(seller_id):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('''
         SELECT product_id, seller_id, product_category, product_name, product_brand, 
@@ -113,22 +96,15 @@ def get_products(seller_id):
 
 
 def delete_product(product_id):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('DELETE FROM products WHERE product_id = ?', (product_id,))
     conn.commit()
     conn.close()
+    invalidate_product_images(product_id)
     st.success("Product deleted successfully!")
 
 
-def fetch_user_designation(username):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT designation FROM users WHERE username = ?', (username,))
-    designation = c.fetchone()[0]
-    conn.close()
-    return designation
-
 # Check if user is logged in
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     user = fetch_logged_in_user()
@@ -332,11 +308,11 @@ with tab1:
         col7.write(f'{quantity} pcs')
         
         if image1:
-            col8.image(image1, caption='Image 1', use_column_width=True)
+            col8.image(product_thumbnail(product_id, 'image1', image1), caption='Image 1', use_column_width=True)
         if image2:
-            col9.image(image2, caption='Image 2', use_column_width=True)
+            col9.image(product_thumbnail(product_id, 'image2', image2), caption='Image 2', use_column_width=True)
         if image3:
-            col10.image(image3, caption='Image 3', use_column_width=True)
+            col10.image(product_thumbnail(product_id, 'image3', image3), caption='Image 3', use_column_width=True)
         
         if col11.button("Delete", key=f"delete_{product_id}"):
             with col11:
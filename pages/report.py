@@ -1,9 +1,8 @@
 import streamlit as st
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-import os
 import plotly.express as px
+from pages.db import fetch_logged_in_user
 
 st.set_page_config(
     page_title="SuperSales - Reports",
@@ -12,16 +11,6 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
-import sqlite3
-# Function to fetch logged-in user's information
-def fetch_logged_in_user():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE state = 1')
-    user = c.fetchone()
-    conn.close()
-    return user
-
 # Check if user is logged in
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     user = fetch_logged_in_user()
@@ -70,11 +59,6 @@ st.markdown(
 )
 
 
-# Function to load data and cache it
-@st.cache_data  # Cache the returned dataframe
-def load_data(file_path):
-    return pd.read_csv(file_path)
-
 
 # Define the navigation bar using HTML/CSS
 navbar_html = """
@@ -216,17 +200,6 @@ else:
 # //////////////////////////////////////////////////////////////////////////////
 # st.title("Dashboard")
 
-# Function to load data and cache it
-@st.cache_data  # Cache the returned dataframe
-def load_data(file_path):
-    return pd.read_csv(file_path)
-
-# Get the directory of the current script
-current_dir = os.path.dirname('app.py')
-file_path = os.path.join(current_dir, 'Data/New/orders_all.csv')
-# Load the properties data
-df = load_data(file_path)
-
 # ///////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
 # border-image: linear-gradient(to right, darkblue, darkorchid) 1;
 col1, col2, col3 = st.columns(3)
@@ -1,9 +1,9 @@
 import streamlit as st
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-import os
 import plotly.express as px
+from pages.db import fetch_logged_in_user
+from pages.analytics import shared_table
 
 st.set_page_config(
     page_title="SuperSales - Reviews",
@@ -12,16 +12,6 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
-import sqlite3
-# Function to fetch logged-in user's information
-def fetch_logged_in_user():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE state = 1')
-    user = c.fetchone()
-    conn.close()
-    return user
-
 # Check if user is logged in
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     user = fetch_logged_in_user()
@@ -70,11 +60,6 @@ st.markdown(
 )
 
 
-# Function to load data and cache it
-@st.cache_data  # Cache the returned dataframe
-def load_data(file_path):
-    return pd.read_csv(file_path)
-
 
 # Define the navbar HTML with updated styles and Font Awesome icons
 navbar_html = """
@@ -199,17 +184,6 @@ else:
 
 # ///////////////////////////////////////////////////////////////////////////////////////////////////
 
-# Function to load data and cache it
-@st.cache_data  # Cache the returned dataframe
-def load_data(file_path):
-    return pd.read_csv(file_path)
-
-# Get the directory of the current script
-current_dir = os.path.dirname('app.py')
-file_path = os.path.join(current_dir, 'Data/New/orders_all.csv')
-# Load the properties data
-df = load_data(file_path)
-
 # ////////////////////////////////////////////////////////////////////////////////////////////////
 st.markdown(
     """
@@ -253,16 +227,8 @@ st.markdown('<div class="header-title">Review Sentiment Dashboard</div>', unsafe
 st.markdown('<div class="header-subtitle">Analyzing the sentiments of product reviews</div>', unsafe_allow_html=True)
 st.markdown("<br>", unsafe_allow_html=True)
 
-# Function to load data and cache it
-@st.cache_data  # Cache the returned dataframe
-def load_data(file_path):
-    return pd.read_csv(file_path)
-
-# Get the directory of the current script
-current_dir = os.path.dirname('app.py')
-file_path = os.path.join(current_dir, 'Data/New/orders_all.csv')
-# Load the properties data
-df = load_data(file_path)
+# Own copy of only the columns this page uses, since it relabels sibert_result below
+df = shared_table('orders_all', ['product_category', 'sibert_result']).copy()
 
 # //////////////////////////////////////////////////////////////////////////////////////
 
@@ -274,7 +240,8 @@ df['sibert_result'] = df['sibert_result'].replace({'POSITIVE': 'Positive', 'NEGA
 color_palette = ['#7defa1', '#83c9ff', '#976de3']
 
 # Create a multi-select dropdown with checkboxes for product categories
-selected_categories = st.multiselect("Select categories to filter:", df['product_category'].unique(), default=df['product_category'].unique())
+product_categories = list(df['product_category'].dropna().unique())
+selected_categories = st.multiselect("Select categories to filter:", product_categories, default=product_categories)
 
 # Filter data based on selected categories
 filtered_df = df[df['product_category'].isin(selected_categories)]
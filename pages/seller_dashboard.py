@@ -1,9 +1,9 @@
 import streamlit as st
 import pandas as pd
 import os
-import sqlite3
-import hashlib
 import plotly.graph_objs as go
+from pages.db import connect, fetch_logged_in_user, update_user_state, fetch_user_designation
+from pages.forecasting import forecast_worker
 
 # Initialize Streamlit
 st.set_page_config(
@@ -33,35 +33,6 @@ customer_states = df['seller_state'].unique()
 customer_states.sort()
 
 # ////////////////////////////////////////////////////////////////////////////////////////////////
-# Function to hash passwords
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-# Function to fetch logged-in user's information
-def fetch_logged_in_user():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE state = 1')
-    user = c.fetchone()
-    conn.close()
-    return user
-
-# Function to update user state in the database
-def update_user_state(username, state):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('UPDATE users SET state = ? WHERE username = ?', (state, username))
-    conn.commit()
-    conn.close()
-
-def fetch_user_designation(username):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT designation FROM users WHERE username = ?', (username,))
-    designation = c.fetchone()[0]
-    conn.close()
-    return designation
-
 # Check if user is logged in
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     user = fetch_logged_in_user()
@@ -85,39 +56,6 @@ def logout():
         st.session_state.user = None
         st.experimental_rerun()
 
-# Function to fetch ordered items for the logged-in user
-def fetch_orders(user_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        SELECT p.product_id, p.product_category, p.product_name, p.product_brand, 
-               p.product_weight_g, p.price, c.order_id, c.order_status, p.image1
-        FROM orders c
-        JOIN products p ON c.product_id = p.product_id
-        WHERE c.seller_id = ? AND c.order_status != 'Cancelled'
-        ORDER BY order_purchase_timestamp DESC
-    ''', (user_id,))
-    orders = c.fetchall()
-    conn.close()
-    return orders
-
-def fetch_delivered_orders(user_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        SELECT p.product_id, p.product_category, p.product_name, p.product_brand, 
-               p.product_weight_g, p.price, c.order_id, c.order_status, p.image1,
-               r.review_score, r.review_comment_message, r.sentiment_result
-        FROM orders c
-        JOIN products p ON c.product_id = p.product_id
-        LEFT JOIN review r ON c.order_id = r.order_id
-        WHERE c.seller_id = ? AND c.order_status = 'Delivered'
-        ORDER BY c.order_purchase_timestamp DESC
-    ''', (user_id,))
-    orders_with_reviews = c.fetchall()
-    conn.close()
-    return orders_with_reviews
-
 # Load custom CSS
 st.markdown('<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/4.7.0/css/font-awesome.min.css">', unsafe_allow_html=True)
 st.markdown('<link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/4.0.0/css/bootstrap.min.css" integrity="sha384-Gn5384xqQ1aoWXA+058RXPxPg6fy4IWvTNh0E263XmFcJlSAwiGgFAW/dAiS6JXm" crossorigin="anonymous">', unsafe_allow_html=True)
@@ -340,54 +278,21 @@ if user_designation:
 user_id = st.session_state.user[0]
 
 # Function to fetch counts of different order statuses
+# (seller_order_summary is kept up to date by triggers on orders, see pages/migrations.py)
 def fetch_order_counts(user_id):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
-    
-    # Total Sales
-    c.execute('''
-        SELECT SUM(p.price)
-        FROM orders c
-        JOIN products p ON c.product_id = p.product_id
-        WHERE c.seller_id = ?
-    ''', (user_id,))
-    total_sales = c.fetchone()[0] or 0.0
-    
-    # Total Customers
     c.execute('''
-        SELECT COUNT(DISTINCT c.customer_id)
-        FROM orders c
-        WHERE c.seller_id = ?
-    ''', (user_id,))
-    total_customers = c.fetchone()[0] or 0
-    
-    # Delivered Orders
-    c.execute('''
-        SELECT COUNT(*)
-        FROM orders c
-        WHERE c.seller_id = ? AND c.order_status = 'Delivered'
-    ''', (user_id,))
-    total_delivered = c.fetchone()[0] or 0
-    
-    # Shipped Orders
-    c.execute('''
-        SELECT COUNT(*)
-        FROM orders c
-        WHERE c.seller_id = ? AND c.order_status = 'Shipped'
+        SELECT total_sales, total_customers, delivered, shipped, cancelled
+        FROM seller_order_summary
+        WHERE seller_id = ?
     ''', (user_id,))
-    total_shipped = c.fetchone()[0] or 0
-    
-    # Cancelled Orders
-    c.execute('''
-        SELECT COUNT(*)
-        FROM orders c
-        WHERE c.seller_id = ? AND c.order_status = 'Cancelled'
-    ''', (user_id,))
-    total_cancelled = c.fetchone()[0] or 0
-    
+    counts = c.fetchone()
     conn.close()
-    
-    return total_sales, total_customers, total_delivered, total_shipped, total_cancelled
+
+    if counts is None:
+        return 0.0, 0, 0, 0, 0
+    return counts
 
 # Fetch order counts for the logged-in seller
 total_sales, total_customers, total_delivered, total_shipped, total_cancelled = fetch_order_counts(user_id)
@@ -456,44 +361,43 @@ with col5:
         unsafe_allow_html=True
     )
 # /////////////////////////////////////////////////////////////////////////////
-# Function to fetch delivered orders with reviews
-def fetch_delivered_orders(user_id):
-    conn = sqlite3.connect('users.db')
+# Function to count positive (score >= 3) and negative reviews on the seller's delivered orders
+def fetch_review_counts(user_id):
+    conn = connect()
     c = conn.cursor()
     c.execute('''
-        SELECT p.product_id, p.product_category, p.product_name, p.product_brand, 
-               p.product_weight_g, p.price, c.order_id, c.order_status, p.image1,
-               r.review_score, r.review_comment_message, r.sentiment_result
+        SELECT COALESCE(SUM(r.review_score >= 3), 0),
+               COALESCE(SUM(r.review_score > 0 AND r.review_score < 3), 0)
+        FROM orders c
+        JOIN review r ON c.order_id = r.order_id
+        WHERE c.seller_id = ? AND c.order_status = 'Delivered'
+    ''', (user_id,))
+    positive_reviews, negative_reviews = c.fetchone()
+    conn.close()
+    return positive_reviews, negative_reviews
+
+# Function to count the seller's delivered orders per product category
+def fetch_category_counts(user_id):
+    conn = connect()
+    c = conn.cursor()
+    c.execute('''
+        SELECT p.product_category, COUNT(*)
         FROM orders c
         JOIN products p ON c.product_id = p.product_id
-        LEFT JOIN review r ON c.order_id = r.order_id
         WHERE c.seller_id = ? AND c.order_status = 'Delivered'
-        ORDER BY c.order_purchase_timestamp DESC
+        GROUP BY p.product_category
+        ORDER BY COUNT(*) DESC
     ''', (user_id,))
-    orders_with_reviews = c.fetchall()
+    categories = dict(c.fetchall())
     conn.close()
-    return orders_with_reviews
+    return categories
 
-# Function to plot graphs using Plotly
-# Example usage in Streamlit
 user_id = st.session_state.user[0]  # Assuming you have a session state variable for user_id
-delivered_orders = fetch_delivered_orders(user_id)
-if not delivered_orders:
+positive_reviews, negative_reviews = fetch_review_counts(user_id)
+categories = fetch_category_counts(user_id)
+if not categories:
     st.warning("No delivered orders found.")
 
-# Count positive and negative reviews
-positive_reviews = sum(1 for order in delivered_orders if order[9] and order[9] >= 3)
-negative_reviews = sum(1 for order in delivered_orders if order[9] and order[9] < 3)
-
-# Orders per category
-categories = {}
-for order in delivered_orders:
-    category = order[1]
-    if category in categories:
-        categories[category] += 1
-    else:
-        categories[category] = 1
-
 # Plotting using Plotly
 fig1 = go.Figure()
 fig1.add_trace(go.Bar(x=['Positive', 'Negative'], y=[positive_reviews, negative_reviews], marker_color=['green', 'red']))
@@ -515,6 +419,37 @@ with colb:
     with st.container(border=True):
         st.markdown('<div class="h-title">Orders per Category</div>', unsafe_allow_html=True)
         st.plotly_chart(fig2, use_container_width=True)           
+
+# Start the background forecaster; it runs the per-category batch on the orders table
+forecast_worker()
+
+# Function to fetch the weekly sales forecast per category for the seller
+# (written by the batch job in pages/forecasting.py)
+def fetch_forecasts(user_id):
+    conn = connect()
+    c = conn.cursor()
+    c.execute('''
+        SELECT product_category, week, predicted
+        FROM forecasts
+        WHERE seller_id = ?
+        ORDER BY product_category, week
+    ''', (user_id,))
+    forecasts = c.fetchall()
+    conn.close()
+    return forecasts
+
+forecasts = fetch_forecasts(user_id)
+with st.container(border=True):
+    st.markdown('<div class="h-title">Sales Forecast per Category</div>', unsafe_allow_html=True)
+    if forecasts:
+        fig3 = go.Figure()
+        for category in dict.fromkeys(row[0] for row in forecasts):
+            rows = [row for row in forecasts if row[0] == category]
+            fig3.add_trace(go.Scatter(x=[row[1] for row in rows], y=[row[2] for row in rows], mode='lines+markers', name=category))
+        fig3.update_layout(xaxis_title='Week', yaxis_title='Predicted Sales (R$)', template='plotly_dark')
+        st.plotly_chart(fig3, use_container_width=True)
+    else:
+        st.info("No forecasts yet. They appear once the forecasting job has run on your orders.")
                      
                     
 # /////////////////////////////////////////////////////////////////////////////////////////////////////////
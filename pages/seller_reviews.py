@@ -1,9 +1,9 @@
 import streamlit as st
 import pandas as pd
 import os
-import sqlite3
-import hashlib
 from datetime import datetime
+from pages.db import connect, fetch_logged_in_user, update_user_state, fetch_user_designation
+from pages.images import image_source
 
 # Initialize Streamlit
 st.set_page_config(
@@ -33,35 +33,6 @@ customer_states = df['seller_state'].unique()
 customer_states.sort()
 
 # ////////////////////////////////////////////////////////////////////////////////////////////////
-# Function to hash passwords
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-# Function to fetch logged-in user's information
-def fetch_logged_in_user():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE state = 1')
-    user = c.fetchone()
-    conn.close()
-    return user
-
-# Function to update user state in the database
-def update_user_state(username, state):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('UPDATE users SET state = ? WHERE username = ?', (state, username))
-    conn.commit()
-    conn.close()
-
-def fetch_user_designation(username):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT designation FROM users WHERE username = ?', (username,))
-    designation = c.fetchone()[0]
-    conn.close()
-    return designation
-
 # Check if user is logged in
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     user = fetch_logged_in_user()
@@ -87,7 +58,7 @@ def logout():
 
 # Function to fetch ordered items for the logged-in user
 def fetch_orders(user_id):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('''
         SELECT p.product_id, p.product_category, p.product_name, p.product_brand, 
@@ -103,7 +74,7 @@ def fetch_orders(user_id):
     return orders
 
 def fetch_delivered_orders(user_id):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('''
         SELECT p.product_id, p.product_category, p.product_name, p.product_brand, 
@@ -121,7 +92,7 @@ def fetch_delivered_orders(user_id):
     return orders_with_reviews
 
 def update_order_status(order_status, order_id):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('''
         UPDATE orders SET order_status = ? WHERE order_id = ?
@@ -370,7 +341,7 @@ with colb:
                     col1, col2, col3, col4, col5, col6, col7 = st.columns([1, 3, 2, 2, 2, 2, 3])
                     
                     if image1:
-                        col1.image(image1, use_column_width=True)
+                        col1.image(image_source(image1), use_column_width=True)
                     col2.write(f'{product_brand} - {product_name}({product_weight_g}g)')
                     col3.write(f'{name}')
                     col4.write(f'{price} R$')
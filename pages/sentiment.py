@@ -0,0 +1,727 @@
+import os
+import sys
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from pages.db import connect
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Review sentiment scoring off the request thread.
+#
+# Submitting a review only inserts it with sentiment_result = 'pending'. A background worker (one
+# per server process) drains pending reviews in micro-batches: it waits up to MAX_WAIT_SECONDS
+# for more reviews to arrive, then scores up to MAX_BATCH_SIZE of them in one pipeline call and
+# writes the labels back.
+#
+# Historical reviews (Data/New/orders_all.csv and the review table) are (re)scored in bulk by
+# python -m pages.sentiment --backfill, which is resumable and never scores the same text twice.
+#
+# Every call site goes through sentiment_cache, so a text that was already scored by the current
+# model version ("Muito bom", "ok", '') is answered from memory or the sentiment_cache table.
+
+SENTIMENT_MODEL = os.environ.get('SUPERSALES_SENTIMENT_MODEL', 'siebert/sentiment-roberta-large-english')
+# One of SENTIMENT_BACKENDS below
+SENTIMENT_BACKEND = os.environ.get('SUPERSALES_SENTIMENT_BACKEND', 'pipeline')
+TFIDF_MODEL_PATH = os.environ.get('SUPERSALES_TFIDF_MODEL', os.path.join('models', 'sentiment_tfidf.joblib'))
+MAX_BATCH_SIZE = int(os.environ.get('SUPERSALES_SENTIMENT_BATCH_SIZE', 32))
+MAX_WAIT_SECONDS = float(os.environ.get('SUPERSALES_SENTIMENT_MAX_WAIT', 0.5))
+SENTIMENT_CACHE_SIZE = int(os.environ.get('SUPERSALES_SENTIMENT_CACHE_SIZE', 10000))
+POLL_SECONDS = 5
+
+PENDING = 'pending'
+
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Sentiment backends. Each has predict(texts) -> labels ('POSITIVE' / 'NEGATIVE') and a version
+# string that changes whenever its predictions could change.
+
+
+class PipelineBackend:
+    # The transformers pipeline for SENTIMENT_MODEL (roberta-large by default)
+
+    def __init__(self, model=SENTIMENT_MODEL):
+        from transformers import pipeline
+        self.pipe = pipeline('sentiment-analysis', model=model)
+        self.version = self.model_version(model)
+
+    @classmethod
+    def model_version(cls, model=SENTIMENT_MODEL):
+        return f'pipeline:{model}'
+
+    def predict(self, texts):
+        return [result['label'] for result in self.pipe(texts, batch_size=len(texts), truncation=True)]
+
+
+class QuantizedPipelineBackend(PipelineBackend):
+    # Same model with its Linear layers dynamically quantized to int8 for faster CPU inference
+
+    def __init__(self, model=SENTIMENT_MODEL):
+        super().__init__(model)
+        import torch
+        self.pipe.model = torch.quantization.quantize_dynamic(self.pipe.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.version = self.model_version(model)
+
+    @classmethod
+    def model_version(cls, model=SENTIMENT_MODEL):
+        return f'int8:{model}'
+
+
+class TfidfBackend:
+    # TF-IDF + logistic regression trained on the large model's labels (see train below)
+
+    _versions = {}  # (path, mtime) -> version, so the file is only hashed again after retraining
+
+    def __init__(self, path=TFIDF_MODEL_PATH):
+        import joblib
+        self.model = joblib.load(path)
+        self.version = self.model_version(path)
+
+    @classmethod
+    def model_version(cls, path=TFIDF_MODEL_PATH):
+        # Retraining writes a new file, so its hash identifies the model
+        key = (path, os.stat(path).st_mtime_ns)
+        if key not in cls._versions:
+            with open(path, 'rb') as f:
+                cls._versions[key] = f'tfidf:{hashlib.sha256(f.read()).hexdigest()[:16]}'
+        return cls._versions[key]
+
+    def predict(self, texts):
+        return self.model.predict(texts).tolist()
+
+    @staticmethod
+    def train(texts, labels, path=TFIDF_MODEL_PATH):
+        import joblib
+        from sklearn.pipeline import make_pipeline
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        model = make_pipeline(TfidfVectorizer(ngram_range=(1, 2), min_df=2, sublinear_tf=True),
+                              LogisticRegression(max_iter=1000, class_weight='balanced'))
+        model.fit(texts, labels)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
+        return model
+
+
+SENTIMENT_BACKENDS = {
+    'pipeline': PipelineBackend,
+    'int8': QuantizedPipelineBackend,
+    'tfidf': TfidfBackend,
+}
+
+def load_backend(name=SENTIMENT_BACKEND):
+    return SENTIMENT_BACKENDS[name]()
+
+# Function to get the version of a backend's predictions without loading it
+def backend_version(name=SENTIMENT_BACKEND):
+    return SENTIMENT_BACKENDS[name].model_version()
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Models are loaded once per process, on first use, and shared by every session
+
+
+def _rss_mb():
+    # Resident set size of this process; /proc is Linux-only, elsewhere fall back to the peak
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class LoadedModel:
+    def __init__(self, model, load_seconds, memory_mb):
+        self.model = model
+        self.load_seconds = load_seconds
+        self.memory_mb = memory_mb
+        self.calls = 0
+        # Pipelines are not safe to call from several threads at once
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    def __init__(self, loader=load_backend):
+        self._loader = loader
+        self._models = {}
+        self._lock = threading.Lock()
+        self._loading = {}  # name -> lock held while that model loads
+
+    def get(self, name=SENTIMENT_BACKEND):
+        entry = self._models.get(name)
+        if entry is not None:
+            return entry
+        with self._lock:
+            loading = self._loading.setdefault(name, threading.Lock())
+        # Only one thread loads a given model; the others wait for it instead of loading a copy
+        with loading:
+            entry = self._models.get(name)
+            if entry is None:
+                rss_before, start = _rss_mb(), time.perf_counter()
+                model = self._loader(name)
+                entry = LoadedModel(model, time.perf_counter() - start, _rss_mb() - rss_before)
+                self._models[name] = entry
+        return entry
+
+    def is_loaded(self, name=SENTIMENT_BACKEND):
+        return name in self._models
+
+    # Function to run the model on a list of texts, one caller at a time
+    def predict(self, texts, name=SENTIMENT_BACKEND):
+        entry = self.get(name)
+        with entry.lock:
+            entry.calls += 1
+            return entry.model.predict(texts)
+
+    def stats(self):
+        return {name: {'load_seconds': entry.load_seconds, 'memory_mb': entry.memory_mb, 'calls': entry.calls}
+                for name, entry in list(self._models.items())}
+
+
+registry = ModelRegistry()
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Memoized results: labels keyed by normalized text hash and model version
+
+SQLITE_MAX_PARAMS = 900
+
+
+# Function to normalize a review so trivially different copies ("Muito  bom ", "muito bom") share a label
+def normalize_text(text):
+    return ' '.join(unicodedata.normalize('NFKC', text).casefold().split())
+
+# Function to get the key a text's sentiment is cached under
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode()).hexdigest()
+
+def cached_labels(conn, hashes, model=None):
+    model = model or backend_version()
+    labels = {}
+    hashes = list(hashes)
+    for i in range(0, len(hashes), SQLITE_MAX_PARAMS):
+        batch = hashes[i:i + SQLITE_MAX_PARAMS]
+        placeholders = ', '.join('?' for _ in batch)
+        labels.update(conn.execute(f'''
+            SELECT text_hash, label FROM sentiment_cache WHERE model = ? AND text_hash IN ({placeholders})
+        ''', [model, *batch]).fetchall())
+    return labels
+
+def store_labels(conn, labels, model=None):
+    model = model or backend_version()
+    conn.executemany('INSERT OR REPLACE INTO sentiment_cache (text_hash, model, label) VALUES (?, ?, ?)',
+                     [(h, model, label) for h, label in labels.items()])
+
+
+class SentimentCache:
+    # An in-memory LRU of up to max_entries labels in front of the sentiment_cache table. It holds
+    # one model version at a time: when backend_version() changes, the LRU is emptied. The table
+    # keeps every version's rows (switching back is free) until prune_cache removes them.
+
+    def __init__(self, max_entries=SENTIMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._labels = OrderedDict()  # text hash -> label, least recently used first
+        self._lock = threading.Lock()
+        self.version = None
+        self.lookups = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.scored = 0
+        self.invalidations = 0
+
+    def _use_version(self, version):
+        # Called with self._lock held
+        if version == self.version:
+            return
+        self._labels.clear()
+        if self.version is not None:
+            self.invalidations += 1
+        self.version = version
+
+    def _remember(self, labels):
+        # Called with self._lock held
+        for h, label in labels.items():
+            self._labels[h] = label
+            self._labels.move_to_end(h)
+        while len(self._labels) > self.max_entries:
+            self._labels.popitem(last=False)
+
+    # Function to get the cached labels of the given hashes, from memory first, then SQLite
+    def lookup(self, hashes, version=None):
+        version = version or backend_version()
+        hashes = set(hashes)
+        with self._lock:
+            self._use_version(version)
+            labels = {}
+            for h in hashes:
+                if h in self._labels:
+                    self._labels.move_to_end(h)
+                    labels[h] = self._labels[h]
+            missing = hashes - labels.keys()
+            self.lookups += len(hashes)
+            self.memory_hits += len(labels)
+        if missing:
+            with connect() as conn:
+                stored = cached_labels(conn, missing, version)
+            with self._lock:
+                self.disk_hits += len(stored)
+                if version == self.version:
+                    self._remember(stored)
+            labels.update(stored)
+        return labels
+
+    # Function to cache freshly scored labels (text hash -> label)
+    def store(self, labels, version=None):
+        version = version or backend_version()
+        with connect() as conn:
+            store_labels(conn, labels, version)
+        with self._lock:
+            self.scored += len(labels)
+            if version == self.version:
+                self._remember(labels)
+
+    # Function to label texts, running score(texts) -> labels only on the ones not cached yet
+    def classify(self, texts, score):
+        version = backend_version()
+        hashes = [text_hash(text) for text in texts]
+        labels = self.lookup(hashes, version)
+        missing = {h: text for h, text in zip(hashes, texts) if h not in labels}
+        if missing:
+            scored = dict(zip(missing, score(list(missing.values()))))
+            self.store(scored, version)
+            labels.update(scored)
+        return [labels[h] for h in hashes]
+
+    # Function to get a text's label if it is cached, without running the model
+    def peek(self, text):
+        h = text_hash(text)
+        return self.lookup([h]).get(h)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'version': self.version,
+                'entries': len(self._labels),
+                'lookups': self.lookups,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'scored': self.scored,
+                'hit_rate': (self.memory_hits + self.disk_hits) / self.lookups if self.lookups else 0.0,
+                'invalidations': self.invalidations,
+            }
+
+
+sentiment_cache = SentimentCache()
+
+# Function to delete the cached labels of every model version but the given one (by default the
+# current backend's); returns how many rows were deleted
+def prune_cache(version=None):
+    version = version or backend_version()
+    with connect() as conn:
+        return conn.execute('DELETE FROM sentiment_cache WHERE model != ?', (version,)).rowcount
+
+# Function to store a review; its sentiment comes from the cache or is filled in by the worker
+def add_review(order_id, order_status, review_score, review_comment_message):
+    try:
+        label = sentiment_cache.peek(review_comment_message or '')
+    except Exception:
+        # The backend's version is not available (e.g. the tfidf model file is missing); the review
+        # is still stored, and the worker scores it once the backend can be loaded
+        label = None
+    with connect() as conn:
+        conn.execute('''
+            INSERT INTO review (order_id, order_status, review_score, review_comment_message, sentiment_result, review_timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (order_id, order_status, review_score, review_comment_message, label or PENDING, datetime.now()))
+    if label is None:
+        sentiment_worker().wake()
+
+# The 'pending' literal is written out (not a parameter) so SQLite can use idx_review_pending
+def queue_depth():
+    with connect() as conn:
+        return conn.execute("SELECT COUNT(*) FROM review WHERE sentiment_result = 'pending'").fetchone()[0]
+
+def fetch_pending(limit):
+    with connect() as conn:
+        return conn.execute('''
+            SELECT review_id, review_comment_message FROM review
+            WHERE sentiment_result = 'pending'
+            ORDER BY review_id LIMIT ?
+        ''', (limit,)).fetchall()
+
+
+class SentimentWorker(threading.Thread):
+    # classify takes a list of texts and returns one label per text; by default the shared
+    # registry's SENTIMENT_BACKEND, loaded on the first batch.
+
+    def __init__(self, classify=None, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT_SECONDS):
+        super().__init__(name='sentiment-worker', daemon=True)
+        self._classify = classify
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self.scored = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.busy_seconds = 0.0
+        self.last_batch_size = 0
+        self.error = None
+
+    def wake(self):
+        self._wake.set()
+
+    def classify(self, texts):
+        if self._classify is None:
+            return registry.predict(texts)
+        return self._classify(texts)
+
+    def run(self):
+        while True:
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+            try:
+                self._gather()
+                while self.drain_once():
+                    pass
+            except Exception as e:
+                # Reviews stay pending and are retried at the next wake-up or poll
+                self.error = e
+                with self._lock:
+                    self.failed_batches += 1
+
+    def _gather(self):
+        # Let more reviews join the batch, unless a full batch is already waiting
+        deadline = time.monotonic() + self.max_wait
+        while time.monotonic() < deadline and queue_depth() < self.max_batch_size:
+            self._wake.wait(min(0.05, max(0.0, deadline - time.monotonic())))
+            self._wake.clear()
+
+    # Function to score one batch of pending reviews; the batch shrinks to whatever is waiting
+    def drain_once(self):
+        rows = fetch_pending(self.max_batch_size)
+        if not rows:
+            return False
+        start = time.perf_counter()
+        labels = sentiment_cache.classify([text or '' for _, text in rows], self.classify)
+        elapsed = time.perf_counter() - start
+        with connect() as conn:
+            conn.executemany('''
+                UPDATE review SET sentiment_result = ?
+                WHERE review_id = ? AND sentiment_result = 'pending'
+            ''', [(label, review_id) for (review_id, _), label in zip(rows, labels)])
+        with self._lock:
+            self.scored += len(rows)
+            self.batches += 1
+            self.busy_seconds += elapsed
+            self.last_batch_size = len(rows)
+        self.error = None
+        return True
+
+    def stats(self):
+        depth = queue_depth()
+        with self._lock:
+            return {
+                'queue_depth': depth,
+                'scored': self.scored,
+                'batches': self.batches,
+                'failed_batches': self.failed_batches,
+                'last_batch_size': self.last_batch_size,
+                'avg_batch_size': self.scored / self.batches if self.batches else 0.0,
+                'texts_per_second': self.scored / self.busy_seconds if self.busy_seconds else 0.0,
+                'error': repr(self.error) if self.error else None,
+                'cache': sentiment_cache.stats(),
+                'models': registry.stats(),
+            }
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+# Function to get the process-wide sentiment worker, starting it on first use
+def sentiment_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = SentimentWorker()
+            _worker.start()
+        return _worker
+
+# Function to submit reviews through add_review to a worker with a stub classifier and check its
+# batches, the labels written back and the queue draining; returns the problems found
+def check_worker(directory, reviews=200, max_batch_size=8):
+    global _worker
+    from pages.db import use_database
+    use_database(os.path.join(directory, 'users.db'))
+    batches = []
+
+    def stub(texts):
+        batches.append(len(texts))
+        time.sleep(0.01 * len(texts))
+        return ['NEGATIVE' if 'bad' in text else 'POSITIVE' for text in texts]
+
+    problems = []
+    worker = SentimentWorker(classify=stub, max_batch_size=max_batch_size, max_wait=0.05)
+    with _worker_lock:
+        _worker = worker
+    worker.start()
+    # Every text is distinct, so the cache in front of the stub never answers for it
+    texts = [f'review {i} was {"bad" if i % 3 == 0 else "good"}' for i in range(reviews)]
+    start = time.perf_counter()
+    for i, text in enumerate(texts):
+        add_review(i + 1, 'delivered', 1 if 'bad' in text else 5, text)
+    while queue_depth() and time.perf_counter() - start < 30:
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    stats = worker.stats()
+    print(f"{reviews} reviews in {stats['batches']} batch(es) of {sorted(set(batches))}, {elapsed:.2f} s")
+
+    if stats['queue_depth']:
+        problems.append(f"{stats['queue_depth']} review(s) still pending after {elapsed:.0f} s")
+    if stats['failed_batches']:
+        problems.append(f"{stats['failed_batches']} failed batch(es): {stats['error']}")
+    if any(size > max_batch_size for size in batches):
+        problems.append(f'batch larger than {max_batch_size}: {max(batches)}')
+    if sum(batches) != reviews:
+        problems.append(f'stub scored {sum(batches)} texts for {reviews} reviews')
+    if len(batches) >= reviews:
+        problems.append('reviews were scored one at a time, not in batches')
+    with connect() as conn:
+        rows = conn.execute('SELECT review_comment_message, sentiment_result FROM review').fetchall()
+    wrong = [(text, label) for text, label in rows if label != ('NEGATIVE' if 'bad' in text else 'POSITIVE')]
+    if len(rows) != reviews or wrong:
+        problems.append(f'{len(rows)} review(s) stored, wrong labels: {wrong[:5]}')
+    return problems
+
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Bulk backfill of historical reviews
+
+BACKFILL_CHUNK_SIZE = 2000
+
+
+def get_checkpoint(conn, name):
+    row = conn.execute('SELECT position FROM backfill_checkpoints WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else 0
+
+def set_checkpoint(conn, name, position):
+    conn.execute('INSERT OR REPLACE INTO backfill_checkpoints (name, position, updated_at) VALUES (?, ?, ?)',
+                 (name, position, datetime.now()))
+
+# Function run in each worker process: score one batch with that process's own copy of the model
+def _score_batch(texts):
+    return registry.predict(texts)
+
+# Function to score texts in MAX_BATCH_SIZE batches, spread over the executor's processes if given
+def score_texts(texts, executor=None):
+    batches = [texts[i:i + MAX_BATCH_SIZE] for i in range(0, len(texts), MAX_BATCH_SIZE)]
+    results = executor.map(_score_batch, batches) if executor is not None else map(_score_batch, batches)
+    return [label for labels in results for label in labels]
+
+# Function to score the texts of one chunk that are not cached yet, and cache them
+def _label_chunk(texts, executor):
+    hashes = {text_hash(text): text for text in texts}
+    version = backend_version()
+    labels = sentiment_cache.lookup(hashes, version)
+    missing = [h for h in hashes if h not in labels]
+    scored = dict(zip(missing, score_texts([hashes[h] for h in missing], executor)))
+    sentiment_cache.store(scored, version)
+    labels.update(scored)
+    return labels, len(missing)
+
+# Function to (re)score review_comment_message in an analytics CSV and write sibert_result back
+def backfill_csv(path, executor=None, chunk_size=BACKFILL_CHUNK_SIZE):
+    import pandas as pd
+    name = f'csv:{os.path.abspath(path)}'
+    with connect() as conn:
+        done = get_checkpoint(conn, name)
+    scored = 0
+    reader = pd.read_csv(path, usecols=['review_comment_message'], chunksize=chunk_size)
+    for i, chunk in enumerate(reader):
+        end = i * chunk_size + len(chunk)
+        if end <= done:
+            continue
+        texts = chunk['review_comment_message'].dropna().astype(str).tolist()
+        _, new = _label_chunk(texts, executor)
+        scored += new
+        with connect() as conn:
+            set_checkpoint(conn, name, end)
+        print(f'{path}: {end} rows, {scored} texts scored')
+
+    # Every text is cached now; write the labels into the file in one atomic replace
+    df = pd.read_csv(path, low_memory=False)
+    texts = df['review_comment_message']
+    has_text = texts.notna()
+    hashes = texts[has_text].astype(str).map(text_hash)
+    with connect() as conn:
+        labels = cached_labels(conn, set(hashes))
+    # Rows without a comment keep whatever they had
+    previous = df['sibert_result'] if 'sibert_result' in df.columns else pd.Series(None, index=df.index)
+    df['sibert_result'] = hashes.map(labels).reindex(df.index).astype(object).where(has_text, previous.astype(object))
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    with connect() as conn:
+        conn.execute('DELETE FROM backfill_checkpoints WHERE name = ?', (name,))
+    return scored
+
+# Function to (re)score every review in the review table, resuming after the last finished chunk
+def backfill_reviews(executor=None, chunk_size=BACKFILL_CHUNK_SIZE):
+    name = 'review'
+    scored = 0
+    with connect() as conn:
+        last_id = get_checkpoint(conn, name)
+    while True:
+        with connect() as conn:
+            rows = conn.execute('''
+                SELECT review_id, review_comment_message FROM review
+                WHERE review_id > ? ORDER BY review_id LIMIT ?
+            ''', (last_id, chunk_size)).fetchall()
+        if not rows:
+            break
+        labels, new = _label_chunk([text or '' for _, text in rows], executor)
+        scored += new
+        last_id = rows[-1][0]
+        # Results and checkpoint commit together, so an interrupted run resumes exactly here
+        with connect() as conn:
+            conn.executemany('UPDATE review SET sentiment_result = ? WHERE review_id = ?',
+                             [(labels[text_hash(text or '')], review_id) for review_id, text in rows])
+            set_checkpoint(conn, name, last_id)
+        print(f'review: up to review_id {last_id}, {scored} texts scored')
+    with connect() as conn:
+        conn.execute('DELETE FROM backfill_checkpoints WHERE name = ?', (name,))
+    return scored
+
+# Function to print texts/second for 1, 2, 4 and 8 worker processes (no cache involved)
+def benchmark_backfill(texts):
+    for workers in [1, 2, 4, 8]:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Load the model in every process before timing
+            list(executor.map(_score_batch, [['warm up']] * workers))
+            start = time.perf_counter()
+            score_texts(texts, executor)
+            elapsed = time.perf_counter() - start
+        print(f'{workers} worker(s): {len(texts) / elapsed:,.1f} texts/s')
+
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Backend comparison on reviews the large model has already labelled
+
+
+# Function to read review texts with their sibert_result label (the large model's answer)
+def labelled_reviews(limit=None):
+    import pandas as pd
+    from pages.analytics import csv_path
+    df = pd.read_csv(csv_path('orders_all'), usecols=['review_comment_message', 'sibert_result']).dropna()
+    df = df[df['sibert_result'].isin(['POSITIVE', 'NEGATIVE'])]
+    if limit:
+        df = df.sample(n=min(limit, len(df)), random_state=0)
+    return df['review_comment_message'].astype(str).tolist(), df['sibert_result'].tolist()
+
+# Function to measure load time, memory, latency, throughput and agreement for each backend
+def compare_backends(texts, labels, names=None):
+    import numpy as np
+    import pandas as pd
+    rows = []
+    for name in names or SENTIMENT_BACKENDS:
+        try:
+            entry = registry.get(name)
+        except Exception as e:
+            print(f'{name}: not available ({e!r})')
+            continue
+        # Latency of a single review, as when one is submitted from the orders page
+        single = []
+        for text in texts[:50]:
+            start = time.perf_counter()
+            registry.predict([text], name)
+            single.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        predicted = [label for i in range(0, len(texts), MAX_BATCH_SIZE)
+                     for label in registry.predict(texts[i:i + MAX_BATCH_SIZE], name)]
+        elapsed = time.perf_counter() - start
+        rows.append({
+            'backend': name,
+            'load_s': entry.load_seconds,
+            'memory_mb': entry.memory_mb,
+            'p50_ms': np.percentile(single, 50) * 1000,
+            'p95_ms': np.percentile(single, 95) * 1000,
+            'texts_per_s': len(texts) / elapsed,
+            'agreement_pct': np.mean(np.array(predicted) == np.array(labels)) * 100,
+        })
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    # python -m pages.sentiment          score every pending review now, then print the metrics
+    # python -m pages.sentiment --check  submit reviews to a worker with a stub classifier and check
+    #                                    its batch sizes, the labels written back and the queue draining
+    # python -m pages.sentiment --stats  only print the queue depth and the cached labels per model
+    # python -m pages.sentiment --prune-cache
+    #                                    delete the cached labels of every model but the current backend's
+    # python -m pages.sentiment --backfill [csv|reviews] [--workers N]
+    #                                    rescore Data/New/orders_all.csv or the review table
+    # python -m pages.sentiment --backfill-bench [--texts N]
+    #                                    texts/s for 1, 2, 4 and 8 worker processes
+    # python -m pages.sentiment --train-tfidf
+    #                                    fit the tfidf backend to orders_all.csv's sibert_result labels
+    # python -m pages.sentiment --compare-backends [--sample N]
+    #                                    latency, throughput, memory and agreement per backend
+    def option(flag, default):
+        i = sys.argv.index(flag) + 1 if flag in sys.argv else len(sys.argv)
+        return sys.argv[i] if i < len(sys.argv) and not sys.argv[i].startswith('--') else default
+
+    if '--check' in sys.argv:
+        import tempfile
+        import pages.db
+        with tempfile.TemporaryDirectory() as directory:
+            problems = check_worker(directory)
+            pages.db.pool.close_all()
+        for problem in problems:
+            print(problem)
+        print('FAILED' if problems else 'OK')
+        sys.exit(1 if problems else 0)
+    if '--train-tfidf' in sys.argv:
+        texts, labels = labelled_reviews()
+        TfidfBackend.train(texts, labels)
+        print(f'Trained on {len(texts)} reviews, saved to {TFIDF_MODEL_PATH}')
+        sys.exit(0)
+    if '--compare-backends' in sys.argv:
+        texts, labels = labelled_reviews(int(option('--sample', 1000)))
+        print(compare_backends(texts, labels).to_string(index=False, float_format=lambda v: f'{v:,.1f}'))
+        sys.exit(0)
+    if '--backfill-bench' in sys.argv:
+        import pandas as pd
+        from pages.analytics import csv_path
+        texts = pd.read_csv(csv_path('orders_all'), usecols=['review_comment_message'])['review_comment_message']
+        benchmark_backfill(texts.dropna().astype(str).head(int(option('--texts', 2000))).tolist())
+        sys.exit(0)
+    if '--backfill' in sys.argv:
+        target = option('--backfill', 'csv')
+        with ProcessPoolExecutor(max_workers=int(option('--workers', os.cpu_count() or 1))) as executor:
+            if target == 'reviews':
+                scored = backfill_reviews(executor)
+            else:
+                from pages.analytics import csv_path
+                scored = backfill_csv(csv_path('orders_all'), executor)
+        print(f'Scored {scored} new text(s)')
+        print(sentiment_cache.stats())
+        sys.exit(0)
+    if '--stats' in sys.argv:
+        print(f'{queue_depth()} review(s) pending')
+        with connect() as conn:
+            for model, count in conn.execute('SELECT model, COUNT(*) FROM sentiment_cache GROUP BY model'):
+                print(f'{model}: {count} cached label(s)')
+        sys.exit(0)
+    if '--prune-cache' in sys.argv:
+        print(f'Deleted {prune_cache()} cached label(s) not from {backend_version()}')
+        sys.exit(0)
+    worker = SentimentWorker()
+    while worker.drain_once():
+        pass
+    for name, model in registry.stats().items():
+        print(f"{name}: loaded in {model['load_seconds']:.1f}s, +{model['memory_mb']:.0f} MB, {model['calls']} call(s)")
+    print(worker.stats())
@@ -0,0 +1,43 @@
+import math
+import streamlit as st
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Paginated table for the report pages.
+#
+# Only the rows of the current page are handed to st.dataframe, so the payload sent to the
+# browser stays the same size however broad the filter is. Sorting works on the whole frame
+# but only the visible rows are ever copied.
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+# Function to show one page of df, with page size, sort column and page number controls
+def paginated_dataframe(df, key, hide_columns=(), height=300):
+    columns = [col for col in df.columns if col not in hide_columns]
+
+    col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
+    with col1:
+        sort_column = st.selectbox('Sort by', ['(none)'] + columns, key=f'{key}_sort')
+    with col2:
+        descending = st.radio('Order', ['Ascending', 'Descending'], horizontal=True, key=f'{key}_order') == 'Descending'
+    with col3:
+        page_size = st.selectbox('Rows per page', PAGE_SIZES, key=f'{key}_page_size')
+    page_count = max(1, math.ceil(len(df) / page_size))
+    # A narrower filter or a bigger page size can leave the remembered page past the end. The
+    # widget gets no value= (it starts at min_value), so clamping it here never conflicts with a default
+    if st.session_state.get(f'{key}_page', 1) > page_count:
+        st.session_state[f'{key}_page'] = page_count
+    with col4:
+        page = st.number_input(f'Page (of {page_count})', min_value=1, max_value=page_count, step=1, key=f'{key}_page')
+
+    start = (page - 1) * page_size
+    stop = min(start + page_size, len(df))
+    if sort_column == '(none)':
+        window = df.iloc[start:stop]
+    else:
+        # Positions of the rows in sorted order; only this page's rows are taken from the frame
+        order = df[sort_column].reset_index(drop=True).sort_values(ascending=not descending, kind='stable', na_position='last').index
+        window = df.iloc[order[start:stop]]
+
+    st.dataframe(window[columns], height=height)
+    st.caption(f'Rows {start + 1 if stop else 0}-{stop} of {len(df)}')
@@ -1,10 +1,11 @@
 import streamlit as st
 import pandas as pd
 import os
-import sqlite3
-import hashlib
 from datetime import datetime
 import re
+from pages.db import connect, fetch_logged_in_user, update_user_state, fetch_user_designation, get_cart_count, fetch_cart_items, calculate_total_price, checkout, OutOfStockError
+from pages.forecasting import forecast_worker
+from pages.images import product_thumbnail
 
 # Initialize Streamlit
 st.set_page_config(
@@ -34,44 +35,6 @@ customer_states = df['seller_state'].unique()
 customer_states.sort()
 
 # ////////////////////////////////////////////////////////////////////////////////////////////////
-# Function to hash passwords
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-# Function to fetch logged-in user's information
-def fetch_logged_in_user():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE state = 1')
-    user = c.fetchone()
-    conn.close()
-    return user
-
-# Function to update user state in the database
-def update_user_state(username, state):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('UPDATE users SET state = ? WHERE username = ?', (state, username))
-    conn.commit()
-    conn.close()
-
-# Function to get cart count
-def get_cart_count(user_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT SUM(quantity) FROM shopping_cart WHERE user_id = ?', (user_id,))
-    count = c.fetchone()[0]
-    conn.close()
-    return count if count else 0
-
-def fetch_user_designation(username):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT designation FROM users WHERE username = ?', (username,))
-    designation = c.fetchone()[0]
-    conn.close()
-    return designation
-
 # Check if user is logged in
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     user = fetch_logged_in_user()
@@ -95,58 +58,15 @@ def logout():
         st.session_state.user = None
         st.experimental_rerun()
 
-# Function to fetch cart items for the logged-in user
-def fetch_cart_items(user_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        SELECT p.product_id, p.seller_id, p.product_category, p.product_name, p.product_brand, 
-               p.product_weight_g, p.product_length_cm, p.product_width_cm, p.product_height_cm, 
-               p.price, c.quantity, p.image1, p.image2, p.image3
-        FROM shopping_cart c
-        JOIN products p ON c.product_id = p.product_id
-        WHERE c.user_id = ?
-    ''', (user_id,))
-    cart_items = c.fetchall()
-    conn.close()
-    return cart_items
-
-def calculate_total_price(user_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        SELECT p.price, c.quantity
-        FROM shopping_cart c
-        JOIN products p ON c.product_id = p.product_id
-        WHERE c.user_id = ?
-    ''', (user_id,))
-    items = c.fetchall()
-    conn.close()
-    
-    total_price = sum(price * quantity for price, quantity in items)
-    return total_price
-
 # Function to get the shipping charge based on the number of previous orders
 def get_shipping_charge(user_id):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('SELECT COUNT(*) FROM orders WHERE customer_id = ?', (user_id,))
     order_count = c.fetchone()[0]
     conn.close()
     return 0 if order_count < 3 else 100
 
-# Function to insert order details into the orders table
-def insert_order(customer_id, seller_id, product_id, order_status, address, phone, price, payment_method, quantity):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    order_purchase_timestamp = datetime.now()
-    c.execute('''
-        INSERT INTO orders (customer_id, seller_id, product_id, order_status, address, phone, total_charge, payment_method, order_purchase_timestamp, quantity)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (customer_id, seller_id, product_id, order_status, address, phone, price, payment_method, order_purchase_timestamp, quantity))
-    conn.commit()
-    conn.close()
-
 # Function to detect card type based on the card number
 def detect_card_type(card_number):
     # Visa
@@ -161,20 +81,6 @@ def detect_card_type(card_number):
     else:
         return None
 
-def clear_cart(user_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM shopping_cart WHERE user_id = ?', (user_id,))
-    conn.commit()
-    conn.close()
-
-def update_product_quantity(product_id, quantity_ordered):
-    conn = sqlite3.connect('users.db')
-    cursor = conn.cursor()
-    cursor.execute("UPDATE products SET quantity = quantity - ? WHERE product_id = ?", (quantity_ordered, product_id))
-    conn.commit()
-    conn.close()
-
 # Load custom CSS
 st.markdown('<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/4.7.0/css/font-awesome.min.css">', unsafe_allow_html=True)
 st.markdown('<link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/4.0.0/css/bootstrap.min.css" integrity="sha384-Gn5384xqQ1aoWXA+058RXPxPg6fy4IWvTNh0E263XmFcJlSAwiGgFAW/dAiS6JXm" crossorigin="anonymous">', unsafe_allow_html=True)
@@ -435,7 +341,7 @@ with colb:
             for item in cart_items:
                 product_id, seller_id, product_category, product_name, product_brand, \
                 product_weight_g, product_length_cm, product_width_cm, product_height_cm, \
-                price, quantity, image1, image2, image3 = item
+                price, quantity, image1 = item
                 
                 col1, col2, col3, col4, col5, col6 = st.columns([1, 3, 2, 2, 2, 1])
                 
@@ -446,7 +352,7 @@ with colb:
                 col6.write(f'{quantity} nos')
                 
                 if image1:
-                    col1.image(image1, use_column_width=True)
+                    col1.image(product_thumbnail(product_id, 'image1', image1), use_column_width=True)
 
                 st.markdown("""<hr style="height:1px;border:none;color:#333;background-color:#333;width:100%;" /> """, unsafe_allow_html=True)
                 
@@ -517,16 +423,16 @@ with colb:
                         st.warning("Please fill in all the required address fields.")
                     else:
                         address_combined = f"{full_name}, {address}, {state}"
-                        for item in cart_items:
-                            product_id, seller_id, quantity, *_ = item
-                            insert_order(st.session_state.user[0], seller_id, product_id, "Processing", address_combined, mobile_number, total_price + shipping_charge, payment_method, quantity)
-                            update_product_quantity(product_id, quantity)
-
-                        # Clear the cart after placing the order
-                        clear_cart(user_id)
-                        
-                        st.toast("Order placed successfully!")
-                        st.switch_page('pages/user_orders.py')
+                        # Orders, stock and cart are updated in a single transaction
+                        try:
+                            checkout(st.session_state.user[0], address_combined, mobile_number, total_price + shipping_charge, payment_method)
+                        except OutOfStockError as e:
+                            st.error(f'Sorry, there is not enough stock left for {e.product_name}. Please update your cart.')
+                        else:
+                            # The new orders go into the sales forecast without waiting for its next poll
+                            forecast_worker().wake()
+                            st.toast("Order placed successfully!")
+                            st.switch_page('pages/user_orders.py')
             # st.markdown("""<hr style="height:1px;border:none;color:#333;background-color:#333;width:100%;" /> """, unsafe_allow_html=True)
 
 # /////////////////////////////////////////////////////////////////////////////////////////////////////////
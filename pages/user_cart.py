@@ -2,8 +2,8 @@ import streamlit as st
 import pandas as pd
 import os
 import plotly.express as px
-import sqlite3
-import hashlib
+from pages.db import connect, fetch_logged_in_user, update_user_state, fetch_user_designation, get_cart_count, remove_from_cart, fetch_cart_items, calculate_total_price
+from pages.images import product_thumbnail
 
 # Initialize Streamlit
 st.set_page_config(
@@ -33,29 +33,8 @@ product_categories = df['product_category'].unique()
 product_categories.sort()
 
 # ////////////////////////////////////////////////////////////////////////////////////////////////
-# Function to hash passwords
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-# Function to fetch logged-in user's information
-def fetch_logged_in_user():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE state = 1')
-    user = c.fetchone()
-    conn.close()
-    return user
-
-# Function to update user state in the database
-def update_user_state(username, state):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('UPDATE users SET state = ? WHERE username = ?', (state, username))
-    conn.commit()
-    conn.close()
-
 def get_products():
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('''
         SELECT product_id, seller_id, product_category, product_name, product_brand, 
@@ -68,37 +47,8 @@ def get_products():
     return products
 
 
-def add_to_cart(user_id, product_id, quantity):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO shopping_cart (user_id, product_id, quantity)
-        VALUES (?, ?, ?)
-    ''', (user_id, product_id, quantity))
-    conn.commit()
-    conn.close()
-
-def remove_from_cart(user_id, product_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        DELETE FROM shopping_cart WHERE user_id = ? AND product_id = ?
-    ''', (user_id, product_id))
-    conn.commit()
-    conn.close()
-
-def is_in_cart(user_id, product_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        SELECT * FROM shopping_cart WHERE user_id = ? AND product_id = ?
-    ''', (user_id, product_id))
-    item = c.fetchone()
-    conn.close()
-    return item is not None
-
 def cart(user_id, product_id):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('''
         SELECT * FROM shopping_cart WHERE user_id = ? AND product_id = ?
@@ -107,23 +57,6 @@ def cart(user_id, product_id):
     conn.close()
     return item
 
-# Function to get cart count
-def get_cart_count(user_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT SUM(quantity) FROM shopping_cart WHERE user_id = ?', (user_id,))
-    count = c.fetchone()[0]
-    conn.close()
-    return count if count else 0
-
-def fetch_user_designation(username):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT designation FROM users WHERE username = ?', (username,))
-    designation = c.fetchone()[0]
-    conn.close()
-    return designation
-
 # Check if user is logged in
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     user = fetch_logged_in_user()
@@ -147,37 +80,6 @@ def logout():
         st.session_state.user = None
         st.experimental_rerun()
 
-# Function to fetch cart items for the logged-in user
-def fetch_cart_items(user_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        SELECT p.product_id, p.seller_id, p.product_category, p.product_name, p.product_brand, 
-               p.product_weight_g, p.product_length_cm, p.product_width_cm, p.product_height_cm, 
-               p.price, c.quantity, p.image1, p.image2, p.image3
-        FROM shopping_cart c
-        JOIN products p ON c.product_id = p.product_id
-        WHERE c.user_id = ?
-    ''', (user_id,))
-    cart_items = c.fetchall()
-    conn.close()
-    return cart_items
-
-def calculate_total_price(user_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        SELECT p.price, c.quantity
-        FROM shopping_cart c
-        JOIN products p ON c.product_id = p.product_id
-        WHERE c.user_id = ?
-    ''', (user_id,))
-    items = c.fetchall()
-    conn.close()
-    
-    total_price = sum(price * quantity for price, quantity in items)
-    return total_price
-
 # Load custom CSS
 st.markdown('<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/4.7.0/css/font-awesome.min.css">', unsafe_allow_html=True)
 st.markdown('<link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/4.0.0/css/bootstrap.min.css" integrity="sha384-Gn5384xqQ1aoWXA+058RXPxPg6fy4IWvTNh0E263XmFcJlSAwiGgFAW/dAiS6JXm" crossorigin="anonymous">', unsafe_allow_html=True)
@@ -494,7 +396,7 @@ else:
     for item in cart_items:
         product_id, seller_id, product_category, product_name, product_brand, \
         product_weight_g, product_length_cm, product_width_cm, product_height_cm, \
-        price, quantity, image1, image2, image3 = item
+        price, quantity, image1 = item
         
         col1, col2, col3, col4, col5, col6, col7, col8, col9 = st.columns([1, 3, 1, 2, 1, 1, 1, 1, 1])
         
@@ -507,7 +409,7 @@ else:
         col8.write(f'{quantity} pcs')
         
         if image1:
-            col1.image(image1, use_column_width=True)
+            col1.image(product_thumbnail(product_id, 'image1', image1), use_column_width=True)
         
         if col9.button("Delete", key=f"delete_{product_id}"):
             remove_from_cart(user_id, product_id)
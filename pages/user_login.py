@@ -1,9 +1,9 @@
 import streamlit as st
 import sqlite3
-import hashlib
 from pages.auth import *
 import pandas as pd
 import os
+from pages.db import connect, hash_password
 # ////////////////////////////////////////////////////////////////////////////////////////////////
 
 # Function to load data and cache it
@@ -24,13 +24,9 @@ customer_states = df['seller_state'].unique()
 customer_states.sort()
 
 # ////////////////////////////////////////////////////////////////////////////////////////////////
-# Function to hash passwords
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
 # Function to create a new user
 def create_user(username, email, password):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     try:
         c.execute('''
@@ -44,7 +40,7 @@ def create_user(username, email, password):
 
 # Function to validate login
 def validate_login(email, password):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('SELECT * FROM users WHERE email = ? AND password = ?', (email, hash_password(password)))
     user = c.fetchone()
@@ -56,7 +52,7 @@ def validate_login(email, password):
 
 # Function to check if user is logged in
 def check_logged_in():
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('SELECT * FROM users WHERE state = 1')
     user = c.fetchone()
@@ -1,9 +1,8 @@
 import streamlit as st
 import pandas as pd
-import os
-import sqlite3
-import hashlib
-from datetime import datetime
+from pages.db import connect, fetch_logged_in_user, update_user_state, fetch_user_designation
+from pages.images import product_thumbnail
+from pages.sentiment import add_review, sentiment_worker
 
 # Initialize Streamlit
 st.set_page_config(
@@ -14,35 +13,6 @@ st.set_page_config(
 )
 
 # ////////////////////////////////////////////////////////////////////////////////////////////////
-# Function to hash passwords
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-# Function to fetch logged-in user's information
-def fetch_logged_in_user():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE state = 1')
-    user = c.fetchone()
-    conn.close()
-    return user
-
-# Function to update user state in the database
-def update_user_state(username, state):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('UPDATE users SET state = ? WHERE username = ?', (state, username))
-    conn.commit()
-    conn.close()
-
-def fetch_user_designation(username):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT designation FROM users WHERE username = ?', (username,))
-    designation = c.fetchone()[0]
-    conn.close()
-    return designation
-
 # Check if user is logged in
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     user = fetch_logged_in_user()
@@ -68,7 +38,7 @@ def logout():
 
 # Function to fetch ordered items for the logged-in user
 def fetch_orders(user_id):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('''
         SELECT c.order_id, p.product_id, p.product_category, p.product_name, p.product_brand, 
@@ -83,7 +53,7 @@ def fetch_orders(user_id):
     return orders
 
 def prev_orders(user_id):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('''
         SELECT c.order_id, p.product_id, p.product_category, p.product_name, p.product_brand, 
@@ -98,7 +68,7 @@ def prev_orders(user_id):
     return orders
 
 def cancel_orders(user_id, product_id):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('''
         UPDATE orders SET order_status = 'Cancelled' WHERE user_id = ? AND product_id = ?
@@ -106,26 +76,12 @@ def cancel_orders(user_id, product_id):
     conn.commit()
     conn.close()
 
-from transformers import pipeline
-def load_sentiment_model():
-    return pipeline('sentiment-analysis', model="siebert/sentiment-roberta-large-english")
-
-sentiment_analysis = load_sentiment_model()
-
-# Function to store the review in the database
-def add_review(order_id, order_status, review_score, review_comment_message, sentiment_result):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO review (order_id, order_status, review_score, review_comment_message, sentiment_result, review_timestamp)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (order_id, order_status, review_score, review_comment_message, sentiment_result, datetime.now()))
-    conn.commit()
-    conn.close()
+# Start the background sentiment scorer (it also picks up reviews left pending by a restart)
+sentiment_worker()
 
 # Function to check if a review already exists
 def check_review(order_id):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('SELECT * FROM review WHERE order_id = ?', (order_id,))
     review = c.fetchone()
@@ -401,7 +357,7 @@ with colb:
                     col1, col2, col3, col4, col5, col6, col7, col8 = st.columns([1, 3, 2, 2, 2, 2, 1, 1])
                     if order_status != 'Delivered' and order_status != 'Cancelled':
                         if image1:
-                            col1.image(image1, use_column_width=True)
+                            col1.image(product_thumbnail(product_id, 'image1', image1), use_column_width=True)
                         col2.write(f'{product_brand} - {product_name}({product_weight_g}g)')
                         col3.write(f'{product_category}')
                         col4.write(f'{price} R$')
@@ -428,7 +384,7 @@ with colb:
                     col1, col2, col3, col4, col5, col6, col7, col8 = st.columns([1, 3, 2, 2, 2, 2, 1, 1])
                     if order_status == 'Delivered' or order_status == 'Cancelled':
                         if image1:
-                            col1.image(image1, use_column_width=True)
+                            col1.image(product_thumbnail(product_id, 'image1', image1), use_column_width=True)
                         col2.write(f'{product_brand} - {product_name}({product_weight_g}g)')
                         col3.write(f'{product_category}')
                         col4.write(f'{price} R$')
@@ -441,9 +397,7 @@ with colb:
                                 review_score = col6.slider("Rate the product", 1, 5, key=f"rating_{order_id}")
                                 review_comment = col7.text_area("Enter your review", key=f"review_{order_id}")
                                 if col8.button("Submit Review", key=f"submit_review_{order_id}"):
-                                    sentiment = sentiment_analysis(review_comment)[0]
-                                    sentiment_result = sentiment['label']
-                                    add_review(order_id, order_status, review_score, review_comment, sentiment_result)
+                                    add_review(order_id, order_status, review_score, review_comment)
                                     st.toast("Thank you for your valueable Review!")
                                     st.rerun()
 
@@ -461,7 +415,7 @@ with colb:
                         review = check_review(order_id)
                         if not review:
                                 if image1:
-                                    col1.image(image1, use_column_width=True)
+                                    col1.image(product_thumbnail(product_id, 'image1', image1), use_column_width=True)
                                 col2.write(f'{product_brand} - {product_name}({product_weight_g}g)')
                                 col3.write(f'{product_category}')
                                 col4.write(f'{price} R$')
@@ -469,9 +423,7 @@ with colb:
                                 review_score = col6.slider("Rate the product", 1, 5, key=f"rating_{product_id}")
                                 review_comment = col7.text_area("Enter your review", key=f"review_{product_id}")
                                 if col8.button("Submit Review", key=f"submit_review_{product_id}"):
-                                    sentiment = sentiment_analysis(review_comment)[0]
-                                    sentiment_result = sentiment['label']
-                                    add_review(order_id, order_status, review_score, review_comment, sentiment_result)
+                                    add_review(order_id, order_status, review_score, review_comment)
                                     st.toast("Thank you for your valueable Review!")
                                 st.rerun()    
 
@@ -2,8 +2,8 @@ import streamlit as st
 import pandas as pd
 import os
 import plotly.express as px
-import sqlite3
-import hashlib
+from pages.db import connect, fetch_logged_in_user, update_user_state, fetch_user_designation, get_cart_count, add_to_cart, remove_from_cart, fetch_cart_product_ids, fetch_product_images
+from pages.images import image_source, product_thumbnail
 
 # Initialize Streamlit
 st.set_page_config(
@@ -33,87 +33,39 @@ product_categories = df['product_category'].unique()
 product_categories.sort()
 
 # ////////////////////////////////////////////////////////////////////////////////////////////////
-# Function to hash passwords
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+# Number of product tiles rendered per catalog page
+CATALOG_PAGE_SIZE = int(os.environ.get('SUPERSALES_CATALOG_PAGE_SIZE', 24))
 
-# Function to fetch logged-in user's information
-def fetch_logged_in_user():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE state = 1')
-    user = c.fetchone()
-    conn.close()
-    return user
-
-# Function to update user state in the database
-def update_user_state(username, state):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('UPDATE users SET state = ? WHERE username = ?', (state, username))
-    conn.commit()
-    conn.close()
-
-def get_products(category=None):
-    conn = sqlite3.connect('users.db')
+# Function to fetch one catalog page (keyset pagination on product_id, no image columns)
+def get_products(category=None, after_id=0, page_size=CATALOG_PAGE_SIZE):
+    conn = connect()
     c = conn.cursor()
     if category:
         c.execute('''
-            SELECT * FROM products WHERE product_category = ?
-        ''', (category,))
+            SELECT product_id, seller_id, product_category, product_name, product_brand,
+                   product_weight_g, product_length_cm, product_width_cm, product_height_cm,
+                   price, quantity
+            FROM products
+            WHERE product_category = ? AND product_id > ?
+            ORDER BY product_id
+            LIMIT ?
+        ''', (category, after_id, page_size + 1))
     else:
-        c.execute('SELECT * FROM products')
+        c.execute('''
+            SELECT product_id, seller_id, product_category, product_name, product_brand,
+                   product_weight_g, product_length_cm, product_width_cm, product_height_cm,
+                   price, quantity
+            FROM products
+            WHERE product_id > ?
+            ORDER BY product_id
+            LIMIT ?
+        ''', (after_id, page_size + 1))
     products = c.fetchall()
     conn.close()
-    return products
+    # The extra row only tells us whether another page exists
+    return products[:page_size], len(products) > page_size
 
 
-def add_to_cart(user_id, product_id, quantity):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO shopping_cart (user_id, product_id, quantity)
-        VALUES (?, ?, ?)
-    ''', (user_id, product_id, quantity))
-    conn.commit()
-    conn.close()
-
-def remove_from_cart(user_id, product_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        DELETE FROM shopping_cart WHERE user_id = ? AND product_id = ?
-    ''', (user_id, product_id))
-    conn.commit()
-    conn.close()
-
-def is_in_cart(user_id, product_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        SELECT * FROM shopping_cart WHERE user_id = ? AND product_id = ?
-    ''', (user_id, product_id))
-    item = c.fetchone()
-    conn.close()
-    return item is not None
-
-# Function to get cart count
-def get_cart_count(user_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT SUM(quantity) FROM shopping_cart WHERE user_id = ?', (user_id,))
-    count = c.fetchone()[0]
-    conn.close()
-    return count if count else 0
-
-def fetch_user_designation(username):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT designation FROM users WHERE username = ?', (username,))
-    designation = c.fetchone()[0]
-    conn.close()
-    return designation
-
 # Check if user is logged in
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     user = fetch_logged_in_user()
@@ -432,13 +384,25 @@ product_categories = product_categories.tolist()
 product_categories.insert(0, "Select...")
 
 # Filter by category with "Select..." as the default option
-selected_category = st.selectbox('Filter by Category', product_categories)
+f1, f2 = st.columns([4, 1])
+with f1:
+    selected_category = st.selectbox('Filter by Category', product_categories)
+with f2:
+    page_size_options = sorted({12, 24, 48, CATALOG_PAGE_SIZE})
+    page_size = st.selectbox('Per page', page_size_options, index=page_size_options.index(CATALOG_PAGE_SIZE))
+
+# Keyset cursors (last product_id of each previous page); reset when the filter changes
+catalog_filter = (selected_category, page_size)
+if st.session_state.get('catalog_filter') != catalog_filter:
+    st.session_state.catalog_filter = catalog_filter
+    st.session_state.catalog_cursors = [0]
 
 # Get products based on the selected category or show all products by default
-if selected_category != "Select...":
-    products = get_products(selected_category)
-else:
-    products = get_products()
+category = selected_category if selected_category != "Select..." else None
+products, has_next_page = get_products(category, st.session_state.catalog_cursors[-1], page_size)
+
+# Image blobs are only fetched for the tiles on this page
+product_images = fetch_product_images([product[0] for product in products])
 
 st.success('Your first 3 orders has no shipping charge!')
 
@@ -454,26 +418,35 @@ cart_count = get_cart_count(user_id)
 if cart_count > 0:
     st.warning(f'{cart_count} item(s) in cart! [Go to cart](user_cart)')
 
+# Look up the whole cart once instead of querying per product tile
+cart_product_ids = fetch_cart_product_ids(user_id)
+
 cols = st.columns(4)
 for i, product in enumerate(products):
     product_id, seller_id, product_category, product_name, product_brand, \
     product_weight_g, product_length_cm, product_width_cm, product_height_cm, \
-    price, quantity, image1, image2, image3 = product
+    price, quantity = product
+    image1, image2, image3 = product_images.get(product_id, (None, None, None))
     
     with cols[i % 4]:
         with st.container(border=True):
             # st.markdown(f'<h4><b>{product_brand} {product_name}</b><h4>', unsafe_allow_html=True)
             if image1:
-                st.image(image1, use_column_width=True)
+                # Grids get the thumbnail; the original is only read when asked for
+                show_original = st.toggle('Full size', key=f"full_{product_id}")
+                if show_original:
+                    st.image(image_source(image1, original=True), use_column_width=True)
+                else:
+                    st.image(product_thumbnail(product_id, 'image1', image1), use_column_width=True)
                 st.write("\n\n")
             with st.container():
                 col_img1, col_img2, col_img3 = st.columns(3)
                 if image1:
-                    col_img1.image(image2, use_column_width=True)
+                    col_img1.image(product_thumbnail(product_id, 'image1', image1), use_column_width=True)
                 if image2:
-                    col_img2.image(image2, use_column_width=True)
+                    col_img2.image(product_thumbnail(product_id, 'image2', image2), use_column_width=True)
                 if image3:
-                    col_img3.image(image3, use_column_width=True)
+                    col_img3.image(product_thumbnail(product_id, 'image3', image3), use_column_width=True)
             st.write(" ")
             st.markdown(f'#### **{product_brand} {product_name}**')
             # st.markdown(f'<i class="fas fa-tags"></i> {product_category}', unsafe_allow_html=True)
@@ -486,8 +459,7 @@ for i, product in enumerate(products):
 
             quantity = st.number_input('Quantity', min_value=1, step=1, key=f"quantity_{product_id}")
 
-            user_id = st.session_state.user[0]
-            in_cart = is_in_cart(user_id, product_id)
+            in_cart = product_id in cart_product_ids
 
             if in_cart:
                 if st.button('Remove from cart', key=f"remove_{product_id}"):
@@ -500,6 +472,20 @@ for i, product in enumerate(products):
                     st.success(f'Added {product_name} to cart')
                     st.experimental_rerun()
 
+# Catalog page selector
+page_number = len(st.session_state.catalog_cursors)
+p1, p2, p3 = st.columns([1, 3, 1])
+with p1:
+    if st.button('Previous', key='catalog_prev', disabled=page_number == 1):
+        st.session_state.catalog_cursors.pop()
+        st.rerun()
+with p2:
+    st.markdown(f'<p style="text-align:center;">Page {page_number}</p>', unsafe_allow_html=True)
+with p3:
+    if st.button('Next', key='catalog_next', disabled=not has_next_page):
+        st.session_state.catalog_cursors.append(products[-1][0])
+        st.rerun()
+
 # /////////////////////////////////////////////////////////////////////////////////////////////////////////
 # st.info('Credit: (aka [Data Professor](https://youtube.com/dataprofessor/))')
 st.markdown(
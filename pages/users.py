@@ -3,7 +3,7 @@ import pandas as pd
 import os
 import plotly.express as px
 import sqlite3
-import hashlib
+from pages.db import connect, hash_password, fetch_logged_in_user, update_user_state
 
 # Initialize Streamlit
 st.set_page_config(
@@ -33,29 +33,8 @@ customer_states = df['seller_state'].unique()
 customer_states.sort()
 
 # ////////////////////////////////////////////////////////////////////////////////////////////////
-# Function to hash passwords
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-# Function to fetch logged-in user's information
-def fetch_logged_in_user():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE state = 1')
-    user = c.fetchone()
-    conn.close()
-    return user
-
-# Function to update user state in the database
-def update_user_state(username, state):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('UPDATE users SET state = ? WHERE username = ?', (state, username))
-    conn.commit()
-    conn.close()
-
 # def create_user(username, email, password):
-#     conn = sqlite3.connect('users.db')
+#     conn = connect()
 #     c = conn.cursor()
 #     try:
 #         c.execute('INSERT INTO users (username, email, password, state) VALUES (?, ?, ?, 0)', (username, email, hash_password(password)))
@@ -66,7 +45,7 @@ def update_user_state(username, state):
 #     conn.close()
 
 def create_user(username, email, password, residing_state):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     try:
         c.execute('''
@@ -80,7 +59,7 @@ def create_user(username, email, password, residing_state):
     st.rerun()
 
 def get_users():
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('SELECT id, username, email, residing_state FROM users WHERE username != "Admin" and designation="Seller"')
     users = c.fetchall()
@@ -88,7 +67,7 @@ def get_users():
     return users
 
 def get_customers():
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('SELECT id, username, email, residing_state FROM users WHERE username != "Admin" and designation="Customer"')
     users = c.fetchall()
@@ -96,7 +75,7 @@ def get_customers():
     return users
 
 def delete_user(user_id):
-    conn = sqlite3.connect('users.db')
+    conn = connect()
     c = conn.cursor()
     c.execute('DELETE FROM users WHERE id = ?', (user_id,))
     conn.commit()
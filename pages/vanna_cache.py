@@ -0,0 +1,425 @@
+import os
+import sys
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from contextlib import nullcontext
+
+# ////////////////////////////////////////////////////////////////////////////////////////////////
+# Persistent cache for the SaleChat (Vanna text-to-SQL) stages.
+#
+# Every remote LLM round trip of the chat page is stored in a SQLite file that survives restarts.
+# Each stage has its own key, TTL and version:
+#   sql                          normalized question
+#   run_sql                      SQL text + data version of the queried database, so results
+#                                expire as soon as the database changes
+#   plotly_code/summary/followup question + SQL + hash of the result frame
+#   chart/plot                   hash of the result frame (+ Plotly code); local steps, cached so
+#                                a fully cached answer never needs the Vanna instance
+# Bumping a stage's version in CACHE_STAGES (new prompt or model) makes its old entries misses.
+# The file is kept under VANNA_CACHE_MB by dropping expired entries, then least recently used ones.
+
+VANNA_CACHE_PATH = os.environ.get('SUPERSALES_VANNA_CACHE', 'vanna_cache.db')
+VANNA_CACHE_BYTES = int(os.environ.get('SUPERSALES_VANNA_CACHE_MB', 256)) * 1024 * 1024
+
+DAY = 24 * 3600
+
+# stage -> (ttl in seconds or None for no expiry, version)
+CACHE_STAGES = {
+    'questions': (DAY, 1),
+    'sql': (7 * DAY, 1),
+    'run_sql': (DAY, 1),
+    'plotly_code': (30 * DAY, 1),
+    'summary': (30 * DAY, 1),
+    'followup': (30 * DAY, 1),
+    'chart': (30 * DAY, 1),
+    'plot': (30 * DAY, 1),
+}
+
+
+# Function to normalize a question so "Top 5 orders?" and "top 5  orders" share an entry
+def normalize_question(question):
+    return ' '.join(unicodedata.normalize('NFKC', question).casefold().split()).rstrip(' ?.!')
+
+# Function to get a key that changes whenever the content of a query result changes
+def frame_hash(df):
+    import pandas as pd
+    h = hashlib.sha256()
+    h.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    try:
+        h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    except TypeError:
+        # Cells holding unhashable values (lists, dicts)
+        h.update(pickle.dumps(df))
+    return h.hexdigest()
+
+# Function to get a version of a SQLite database file that changes on every committed write
+def data_version(db_path):
+    parts = []
+    for path in [db_path, f'{db_path}-wal']:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        parts.append(f'{stat.st_mtime_ns}:{stat.st_size}')
+    return '/'.join(parts)
+
+
+class DiskCache:
+    def __init__(self, path=VANNA_CACHE_PATH, max_bytes=VANNA_CACHE_BYTES, stages=CACHE_STAGES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stages = stages
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode = WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                stage TEXT NOT NULL,
+                key TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (stage, key)
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)')
+        self.counts = {stage: {'hits': 0, 'misses': 0, 'stale': 0, 'stores': 0, 'evictions': 0}
+                       for stage in stages}
+
+    @staticmethod
+    def key(parts):
+        return hashlib.sha256('\x1f'.join(str(part) for part in parts).encode()).hexdigest()
+
+    def _fresh(self, stage, version, created_at, now):
+        ttl, current = self.stages[stage]
+        return version == current and (ttl is None or now - created_at < ttl)
+
+    # Function to look up an entry; returns (found, value)
+    def get(self, stage, parts):
+        key, now = self.key(parts), time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT version, value, created_at FROM entries WHERE stage = ? AND key = ?',
+                                     (stage, key)).fetchone()
+            counts = self.counts[stage]
+            if row is None:
+                counts['misses'] += 1
+                return False, None
+            version, value, created_at = row
+            if not self._fresh(stage, version, created_at, now):
+                counts['stale'] += 1
+                counts['misses'] += 1
+                self._conn.execute('DELETE FROM entries WHERE stage = ? AND key = ?', (stage, key))
+                return False, None
+            counts['hits'] += 1
+            self._conn.execute('UPDATE entries SET accessed_at = ? WHERE stage = ? AND key = ?', (now, stage, key))
+        return True, pickle.loads(value)
+
+    # Function to look up an entry like get, without counting the lookup or touching the entry
+    def peek(self, stage, parts):
+        with self._lock:
+            row = self._conn.execute('SELECT version, value, created_at FROM entries WHERE stage = ? AND key = ?',
+                                     (stage, self.key(parts))).fetchone()
+        if row is None or not self._fresh(stage, row[0], row[2], time.time()):
+            return False, None
+        return True, pickle.loads(row[1])
+
+    def put(self, stage, parts, value):
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        if len(data) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute('''
+                INSERT OR REPLACE INTO entries (stage, key, version, value, size, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (stage, self.key(parts), self.stages[stage][1], data, len(data), now, now))
+            self.counts[stage]['stores'] += 1
+            self._evict(now)
+
+    def _evict(self, now):
+        # Called with self._lock held: expired and outdated entries first, then least recently used
+        for stage, (ttl, version) in self.stages.items():
+            deleted = self._conn.execute('''
+                DELETE FROM entries WHERE stage = ? AND (version != ? OR created_at < ?)
+            ''', (stage, version, now - ttl if ttl is not None else float('-inf'))).rowcount
+            self.counts[stage]['evictions'] += max(deleted, 0)
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for stage, key, size in self._conn.execute('SELECT stage, key, size FROM entries ORDER BY accessed_at'):
+            if total <= self.max_bytes:
+                break
+            victims.append((stage, key))
+            total -= size
+        self._conn.executemany('DELETE FROM entries WHERE stage = ? AND key = ?', victims)
+        for stage, _ in victims:
+            if stage in self.counts:
+                self.counts[stage]['evictions'] += 1
+
+    # Function to return the cached value, or compute, store and return it. None is not cached,
+    # so a failed generation is retried next time.
+    def get_or_compute(self, stage, parts, compute):
+        found, value = self.get(stage, parts)
+        if found:
+            return value
+        value = compute()
+        if value is not None:
+            self.put(stage, parts, value)
+        return value
+
+    def clear(self, stage=None):
+        with self._lock:
+            if stage is None:
+                self._conn.execute('DELETE FROM entries')
+            else:
+                self._conn.execute('DELETE FROM entries WHERE stage = ?', (stage,))
+
+    def stats(self):
+        with self._lock:
+            stored = {stage: (entries, size) for stage, entries, size in self._conn.execute(
+                'SELECT stage, COUNT(*), SUM(size) FROM entries GROUP BY stage')}
+            stats = {}
+            for stage, counts in self.counts.items():
+                lookups = counts['hits'] + counts['misses']
+                entries, size = stored.get(stage, (0, 0))
+                stats[stage] = {**counts, 'entries': entries, 'bytes': size,
+                                'hit_rate': counts['hits'] / lookups if lookups else 0.0}
+            return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+# Function to get the process-wide cache, opening VANNA_CACHE_PATH on first use
+def vanna_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskCache()
+        return _cache
+
+
+class CachedVanna:
+    # The Vanna calls SaleChat makes, answered from the disk cache when possible. get_vn returns
+    # the Vanna instance and is only called on a miss, so a warm cache never contacts the
+    # service. spinner(stage), if given, returns a context manager shown while a stage computes.
+
+    def __init__(self, get_vn, db_path, cache=None, model='', spinner=None):
+        self._get_vn = get_vn
+        self.db_path = db_path
+        self.cache = cache or vanna_cache()
+        self.model = model
+        self._spinner = spinner or (lambda stage: nullcontext())
+
+    def _cached(self, stage, parts, compute):
+        def run():
+            with self._spinner(stage):
+                return compute(self._get_vn())
+        return self.cache.get_or_compute(stage, [self.model, *parts], run)
+
+    def generate_questions(self):
+        return self._cached('questions', [], lambda vn: vn.generate_questions())
+
+    def generate_sql(self, question):
+        return self._cached('sql', [normalize_question(question)],
+                            lambda vn: vn.generate_sql(question=question, allow_llm_to_see_data=True))
+
+    def run_sql(self, sql):
+        return self._cached('run_sql', [sql.strip(), data_version(self.db_path)], lambda vn: vn.run_sql(sql=sql))
+
+    def generate_plotly_code(self, question, sql, df):
+        return self._cached('plotly_code', [normalize_question(question), sql.strip(), frame_hash(df)],
+                            lambda vn: vn.generate_plotly_code(question=question, sql=sql, df=df))
+
+    def generate_summary(self, question, df):
+        return self._cached('summary', [normalize_question(question), frame_hash(df)],
+                            lambda vn: vn.generate_summary(question=question, df=df))
+
+    def generate_followup_questions(self, question, sql, df):
+        return self._cached('followup', [normalize_question(question), sql.strip(), frame_hash(df)],
+                            lambda vn: vn.generate_followup_questions(question=question, sql=sql, df=df))
+
+    def should_generate_chart(self, df):
+        return self._cached('chart', [frame_hash(df)], lambda vn: vn.should_generate_chart(df=df))
+
+    def get_plotly_figure(self, plotly_code, df):
+        return self._cached('plot', [plotly_code.strip(), frame_hash(df)],
+                            lambda vn: vn.get_plotly_figure(plotly_code=plotly_code, df=df))
+
+    # Function to get the post-query stages (see pages/chat_stages.py) that would call Vanna rather
+    # than read the cache, without counting the lookups; uses the same keys as the methods above
+    def misses(self, question, sql, df, chart=True, plot=True, summary=True, followup=True):
+        question, sql, h = normalize_question(question), sql.strip(), frame_hash(df)
+        missing = []
+
+        def peek(stage, parts):
+            found, value = self.cache.peek(stage, [self.model, *parts])
+            if not found:
+                missing.append(stage)
+            return value
+
+        if chart and peek('chart', [h]):
+            code = peek('plotly_code', [question, sql, h])
+            if code and plot:
+                peek('plot', [code.strip(), h])
+        if summary:
+            peek('summary', [question, h])
+        if followup:
+            peek('followup', [question, sql, h])
+        return missing
+
+
+class FakeVanna:
+    # Local stand-in for VannaDefault: canned LLM answers, real queries against a SQLite file,
+    # and a call count per method. latency (seconds) is added to every LLM call.
+
+    def __init__(self, db_path, latency=0.0):
+        self.db_path = db_path
+        self.latency = latency
+        self.calls = {}
+
+    def _llm(self, method, answer):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        time.sleep(self.latency)
+        return answer
+
+    def generate_questions(self):
+        return self._llm('generate_questions', ['What are the top 5 orders with the highest price?'])
+
+    def generate_sql(self, question, allow_llm_to_see_data=False):
+        return self._llm('generate_sql', 'SELECT order_id, price FROM orders ORDER BY price DESC LIMIT 5')
+
+    def is_sql_valid(self, sql):
+        return sql.strip().upper().startswith('SELECT')
+
+    def run_sql(self, sql):
+        import pandas as pd
+        self.calls['run_sql'] = self.calls.get('run_sql', 0) + 1
+        with sqlite3.connect(self.db_path) as conn:
+            return pd.read_sql_query(sql, conn)
+
+    def should_generate_chart(self, df):
+        return len(df) > 1 and len(df.select_dtypes('number').columns) > 0
+
+    def generate_plotly_code(self, question, sql, df):
+        return self._llm('generate_plotly_code', f"fig = px.bar(df, x='{df.columns[0]}', y='{df.columns[-1]}')")
+
+    def get_plotly_figure(self, plotly_code, df):
+        import plotly.express as px
+        scope = {'df': df, 'px': px}
+        exec(plotly_code, scope)
+        return scope.get('fig')
+
+    def generate_summary(self, question, df):
+        return self._llm('generate_summary', f'{len(df)} rows, highest value {df.iloc[:, -1].max()}')
+
+    def generate_followup_questions(self, question, sql, df):
+        return self._llm('generate_followup_questions', ['Which sellers sold them?', 'In which month?'])
+
+
+# Function to exercise every stage against FakeVanna in a scratch directory; returns the problems found
+def check_cache(directory):
+    problems = []
+    db_path = os.path.join(directory, 'orders.db')
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('CREATE TABLE orders (order_id TEXT, price REAL)')
+        conn.executemany('INSERT INTO orders VALUES (?, ?)', [(f'o{i}', float(i)) for i in range(20)])
+    stages = dict(CACHE_STAGES)
+    cache = DiskCache(os.path.join(directory, 'cache.db'), stages=stages)
+    vn = FakeVanna(db_path)
+
+    def expect(label, method, calls):
+        if vn.calls.get(method, 0) != calls:
+            problems.append(f'{label}: {method} called {vn.calls.get(method, 0)} time(s), expected {calls}')
+
+    def ask(chat, question):
+        sql = chat.generate_sql(question)
+        df = chat.run_sql(sql)
+        chat.should_generate_chart(df)
+        chat.generate_plotly_code(question, sql, df)
+        chat.generate_summary(question, df)
+        chat.generate_followup_questions(question, sql, df)
+        return df
+
+    def unreachable():
+        raise AssertionError('Vanna contacted on a warm cache')
+
+    ask(CachedVanna(lambda: vn, db_path, cache), 'What are the top 5 orders with the highest price?')
+    # A new process: the stages are answered from disk, and the Vanna factory is never called
+    restarted = CachedVanna(unreachable, db_path, DiskCache(cache.path, stages=stages))
+    df = ask(restarted, '  what are the TOP 5 orders with the highest price ')
+    for method in ['generate_sql', 'run_sql', 'generate_plotly_code', 'generate_summary',
+                   'generate_followup_questions']:
+        expect('restart', method, 1)
+    # The chat page only sets Vanna up when one of the stages it shows would miss
+    question = 'What are the top 5 orders with the highest price?'
+    missing = restarted.misses(question, restarted.generate_sql(question), df, plot=False)
+    if missing:
+        problems.append(f'restart: {missing} reported as misses on a warm cache')
+    if restarted.misses('Which sellers sold them?', restarted.generate_sql(question), df, chart=False) != ['summary', 'followup']:
+        problems.append('new question: summary and followup not reported as misses')
+
+    # Writing to the database changes the data version, so the result and everything keyed on it is recomputed
+    time.sleep(0.01)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('INSERT INTO orders VALUES (?, ?)', ('o99', 99.0))
+    chat = CachedVanna(lambda: vn, db_path, cache)
+    changed = ask(chat, 'What are the top 5 orders with the highest price?')
+    expect('data changed', 'generate_sql', 1)
+    expect('data changed', 'run_sql', 2)
+    expect('data changed', 'generate_summary', 2)
+    if changed.equals(df):
+        problems.append('data changed: stale query result returned')
+
+    # A version bump or an expired TTL turns entries into misses
+    stages['sql'] = (stages['sql'][0], stages['sql'][1] + 1)
+    chat.generate_sql('What are the top 5 orders with the highest price?')
+    expect('version bump', 'generate_sql', 2)
+    stages['summary'] = (0, stages['summary'][1])
+    chat.generate_summary('What are the top 5 orders with the highest price?', changed)
+    expect('ttl', 'generate_summary', 3)
+
+    # The size cap evicts least recently used entries
+    small = DiskCache(os.path.join(directory, 'small.db'), max_bytes=4096, stages=stages)
+    for i in range(20):
+        small.put('sql', [i], 'x' * 500)
+    size = sum(stage['bytes'] for stage in small.stats().values())
+    if size > 4096:
+        problems.append(f'size cap: {size} bytes stored, cap is 4096')
+    if small.get('sql', [0])[0] or not small.get('sql', [19])[0]:
+        problems.append('size cap: eviction did not drop the least recently used entries')
+
+    for stage, stats in restarted.cache.stats().items():
+        # The figure needs plotly, so the check never draws it
+        if stage not in ('questions', 'plot') and stats['hit_rate'] != 1:
+            problems.append(f"stats: {stage} hit rate {stats['hit_rate']:.2f} after restart, expected 1")
+    return problems
+
+
+if __name__ == '__main__':
+    # python -m pages.vanna_cache                print entries, size and hit rates per stage
+    # python -m pages.vanna_cache --clear [stage]  drop every entry, or those of one stage
+    # python -m pages.vanna_cache --check        exercise the cache against FakeVanna
+    if '--check' in sys.argv:
+        import tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            problems = check_cache(directory)
+        for problem in problems:
+            print(problem)
+        print('FAILED' if problems else 'OK')
+        sys.exit(1 if problems else 0)
+    if '--clear' in sys.argv:
+        i = sys.argv.index('--clear') + 1
+        vanna_cache().clear(sys.argv[i] if i < len(sys.argv) else None)
+    for stage, stats in vanna_cache().stats().items():
+        print(f"{stage}: {stats['entries']} entries, {stats['bytes'] / 1024:,.0f} KB")
@@ -1,58 +1,74 @@
 import streamlit as st
 
 from vanna.remote import VannaDefault
+from pages.vanna_cache import CachedVanna
+
+VANNA_MODEL = 'super_sales'
+VANNA_DB_PATH = r'D:\Sales\sale\orders.db'
+
+SPINNER_TEXT = {
+    'questions': "Generating sample questions ...",
+    'sql': "Generating SQL query ...",
+    'run_sql': "Running SQL query ...",
+    'plotly_code': "Generating Plotly code ...",
+    'summary': "Generating summary ...",
+    'followup': "Generating follow-up questions ...",
+    'chart': "Checking if we should generate a chart ...",
+    'plot': "Running Plotly code ...",
+}
 
 @st.cache_resource(ttl=3600)
 def setup_vanna():
-    vn = VannaDefault(model='super_sales', api_key='fcaea5a7cc08496eb79f31804da82b8e')
-    vn.connect_to_sqlite('D:\Sales\sale\orders.db')  # Print the passed value
+    vn = VannaDefault(model=VANNA_MODEL, api_key='fcaea5a7cc08496eb79f31804da82b8e')
+    vn.connect_to_sqlite(VANNA_DB_PATH)  # Print the passed value
     return vn
 
-@st.cache_data(show_spinner="Generating sample questions ...")
+# The LLM stages and query results are cached on disk (see pages/vanna_cache.py), so they survive
+# restarts and query results expire when orders.db changes; Vanna is only set up on a miss.
+@st.cache_resource
+def cached_vanna():
+    return CachedVanna(setup_vanna, VANNA_DB_PATH, model=VANNA_MODEL, spinner=lambda stage: st.spinner(SPINNER_TEXT[stage]))
+
+# Same cache without spinners, for the post-query stages that run off the script thread
+# (pages/chat_stages.py). st.cache_resource must not be called from the stage pool's threads, so
+# setup_vanna() runs here, on the script thread, and only when one of the shown stages is not cached.
+def background_vanna(question, sql, df, **shown):
+    chat = CachedVanna(lambda: vn, VANNA_DB_PATH, model=VANNA_MODEL)
+    vn = setup_vanna() if chat.misses(question, sql, df, **shown) else None
+    return chat
+
 def generate_questions_cached():
-    vn = setup_vanna()
-    return vn.generate_questions()
+    return cached_vanna().generate_questions()
 
-@st.cache_data(show_spinner="Generating SQL query ...")
 def generate_sql_cached(question: str):
-    vn = setup_vanna()
-    return vn.generate_sql(question=question, allow_llm_to_see_data=True)
+    return cached_vanna().generate_sql(question)
 
 @st.cache_data(show_spinner="Checking for valid SQL ...")
 def is_sql_valid_cached(sql: str):
     vn = setup_vanna()
     return vn.is_sql_valid(sql=sql)
 
-@st.cache_data(show_spinner="Running SQL query ...")
 def run_sql_cached(sql: str):
-    vn = setup_vanna()
-    return vn.run_sql(sql=sql)
+    return cached_vanna().run_sql(sql)
 
 @st.cache_data(show_spinner="Checking if we should generate a chart ...")
 def should_generate_chart_cached(question, sql, df):
     vn = setup_vanna()
     return vn.should_generate_chart(df=df)
 
-@st.cache_data(show_spinner="Generating Plotly code ...")
 def generate_plotly_code_cached(question, sql, df):
-    vn = setup_vanna()
-    code = vn.generate_plotly_code(question=question, sql=sql, df=df)
-    return code
+    return cached_vanna().generate_plotly_code(question, sql, df)
 
 @st.cache_data(show_spinner="Running Plotly code ...")
 def generate_plot_cached(code, df):
     vn = setup_vanna()
     return vn.get_plotly_figure(plotly_code=code, df=df)
 
-@st.cache_data(show_spinner="Generating follow-up questions ...")
 def generate_followup_cached(question, sql, df):
-    vn = setup_vanna()
-    return vn.generate_followup_questions(question=question, sql=sql, df=df)
+    return cached_vanna().generate_followup_questions(question, sql, df)
 
-@st.cache_data(show_spinner="Generating summary ...")
 def generate_summary_cached(question, df):
-    vn = setup_vanna()
-    return vn.generate_summary(question=question, df=df)
+    return cached_vanna().generate_summary(question, df)
 
 # Streamlit app layout and logic
 st.title("Supermarket Sales Analysis")
@@ -1,9 +1,10 @@
 import streamlit as st
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-import os
 import plotly.express as px
+from pages.db import fetch_logged_in_user
+from pages.analytics import shared_table, shared_cube
+from pages.tables import paginated_dataframe
 
 st.set_page_config(
     page_title="SuperSales - Report",
@@ -12,16 +13,6 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
-import sqlite3
-# Function to fetch logged-in user's information
-def fetch_logged_in_user():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE state = 1')
-    user = c.fetchone()
-    conn.close()
-    return user
-
 # Check if user is logged in
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     user = fetch_logged_in_user()
@@ -70,11 +61,6 @@ st.markdown(
 )
 
 
-# Function to load data and cache it
-@st.cache_data  # Cache the returned dataframe
-def load_data(file_path):
-    return pd.read_csv(file_path)
-
 
 # Define the navigation bar using HTML/CSS
 navbar_html = """
@@ -200,16 +186,10 @@ else:
 
 # st.title("Dashboard")
 
-# Function to load data and cache it
-@st.cache_data  # Cache the returned dataframe
-def load_data(file_path):
-    return pd.read_csv(file_path)
-
-# Get the directory of the current script
-current_dir = os.path.dirname('app.py')
-file_path = os.path.join(current_dir, 'Data/New/all_details.csv')
-# Load the properties data
-df = load_data(file_path)
+# Shared, read-only view of the properties data (typed Parquet cache of Data/New/all_details.csv)
+df = shared_table('all_details')
+# Pre-aggregated totals and histograms for the report below
+cube = shared_cube('all_details')
 
 # //////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
 st.markdown(
@@ -241,28 +221,17 @@ st.markdown("<br>", unsafe_allow_html=True)
 
 import plotly.express as px
 import plotly.graph_objects as go
-# Convert date columns to datetime
-date_columns = [
-    'order_purchase_timestamp', 'order_delivered_carrier_date',
-    'order_delivered_customer_date', 'order_estimated_delivery_date',
-    'shipping_limit_date', 'review_answer_timestamp'
-]
-for col in date_columns:
-    df[col] = pd.to_datetime(df[col], errors='coerce')
-
 # Get unique product categories
-product_categories = df['customer_state'].unique()
-product_categories.sort()
+product_categories = sorted(df['customer_state'].dropna().unique())
 
 # Create a dropdown for selecting a product category
 selected_category = st.selectbox('Select State of Customer', product_categories)
 # Filter the DataFrame based on the selected product category
 filtered_df = df[df['customer_state'] == selected_category]
 
-# Drop the product_category column from the filtered data for display
-display_df = filtered_df.drop(columns=['customer_state'])
-total_price = filtered_df['price'].sum()
-total_price_all = df['price'].sum()
+selection = cube.select(customer_state=selected_category)
+total_price = selection.total_price()
+total_price_all = cube.total_price()
 
 # Main content
 st.markdown(f'<div class="header-subtitle">Insights for purchases from {selected_category}</div>', unsafe_allow_html=True)
@@ -273,7 +242,7 @@ cola, colb = st.columns(2)
 with cola:
     st.markdown(f"""
     <div class="md-6" style="background-color: rgb(213 213 213 / 57%); padding: 10px; border-radius: 5px; display:flex; margin-bottom: 10px;">
-            <h4><b>Number of products</b></h4><h4 style="color: #0c0c7a;"><b>{filtered_df.shape[0]} / {df.shape[0]}</b></h4>
+            <h4><b>Number of products</b></h4><h4 style="color: #0c0c7a;"><b>{selection.count()} / {cube.count()}</b></h4>
     </div>
     """, unsafe_allow_html=True)
 
@@ -286,7 +255,7 @@ with colb:
 
 # Display the filtered DataFrame without the product_category column
 st.write("#### Filtered Data")
-st.dataframe(display_df, height=300)
+paginated_dataframe(filtered_df, 'z_seller_table', hide_columns=['customer_state'])
 
 # Example: Generate some graphs using Plotly
 st.write("#### Graphs for the Selected Category")
@@ -295,15 +264,14 @@ col1, col2, col3, col4 = st.columns(4)
 
 with col1:
     # Price distribution
-    fig = px.histogram(filtered_df, x='price', nbins=20, title='Sales Distribution',
-                       color_discrete_sequence=['#636EFA'])
-    fig.update_layout(xaxis_title='Price', yaxis_title='Frequency', template='plotly_white')
+    fig = px.bar(selection.price_histogram(), x='price', y='count', title='Sales Distribution',
+                 color_discrete_sequence=['#636EFA'])
+    fig.update_layout(xaxis_title='Price', yaxis_title='Frequency', template='plotly_white', bargap=0)
     st.plotly_chart(fig, use_container_width=True)
 
 with col2:
     # Order status counts
-    order_status_counts = filtered_df['order_status'].value_counts().reset_index()
-    order_status_counts.columns = ['order_status', 'count']
+    order_status_counts = selection.value_counts('order_status')
     fig = px.bar(order_status_counts, x='order_status', y='count', title='Order Status Counts',
                  color_discrete_sequence=['#EF553B'])
     fig.update_layout(xaxis_title='Order Status', yaxis_title='Count', template='plotly_white')
@@ -311,15 +279,14 @@ with col2:
 
 with col3:
     # Review score distribution
-    fig = px.histogram(filtered_df, x='review_score', nbins=5, title='Review Score Distribution',
-                       color_discrete_sequence=['#00CC96'])
+    fig = px.bar(selection.review_histogram(), x='review_score', y='count', title='Review Score Distribution',
+                 color_discrete_sequence=['#00CC96'])
     fig.update_layout(xaxis_title='Review Score', yaxis_title='Frequency', template='plotly_white')
     st.plotly_chart(fig, use_container_width=True)
 
 with col4:
     # Order status counts
-    order_status_counts = filtered_df['payment_type'].value_counts().reset_index()
-    order_status_counts.columns = ['payment_type', 'count']
+    order_status_counts = selection.value_counts('payment_type')
     fig = px.bar(order_status_counts, x='payment_type', y='count', title='Payment Method Counts',
                  color_discrete_sequence=['#c79403'])
     fig.update_layout(xaxis_title='Payment Method', yaxis_title='Count', template='plotly_white')